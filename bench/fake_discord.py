@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timezone
+
+# Заглушки discord.Interaction / commands.Context для прогона команд без Discord.
+# Отправка сообщений только имитирует задержку HTTP и запоминает отправленное.
+class FakeRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+class FakeUser:
+    def __init__(self, user_id: int, role_ids=(), name: str = None):
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.roles = [FakeRole(role_id) for role_id in role_ids]
+        self.joined_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.sent = []
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+class FakeChannel:
+    def __init__(self, channel_id: int, latency: float = 0.0):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((content, kwargs))
+        return FakeMessage(self)
+
+class FakeGuild:
+    def __init__(self, guild_id: int, members=()):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.members = {member.id: member for member in members}
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, mentions=()):
+        self.id = 0
+        self.channel = channel
+        self.mentions = list(mentions)
+
+    async def delete(self):
+        pass
+
+    async def edit(self, **kwargs):
+        pass
+
+class FakeResponse:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._done = False
+        self.sent = []
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self, payload):
+        if self._done:
+            raise RuntimeError("Interaction has already been responded to")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._done = True
+        self.sent.append(payload)
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond((content, kwargs))
+
+    async def defer(self, **kwargs):
+        await self._respond(("defer", kwargs))
+
+    async def send_modal(self, modal):
+        await self._respond(("modal", modal))
+
+class FakeFollowup:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((content, kwargs))
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser, guild: FakeGuild, channel: FakeChannel, latency: float = 0.0):
+        self.user = user
+        self.guild = guild
+        self.channel = channel
+        self.channel_id = channel.id
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(latency)
+        self.followup = FakeFollowup(latency)
+        self.message = FakeMessage(channel)
+
+    async def original_response(self):
+        return self.message
+
+class FakeContext:
+    def __init__(self, author: FakeUser, guild: FakeGuild, channel: FakeChannel, mentions=()):
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.message = FakeMessage(channel, mentions)
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import threading
+import time
+
+from db_cache import generate_push_key
+from rtdb_query import filter_children
+
+# Замена firebase_admin.db в памяти: то же API Reference/Query, настраиваемая
+# задержка на каждый запрос и счетчик обращений к "серверу".
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0):
+        self.data = {}
+        self.latency = latency
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def reference(self, path: str = "/"):
+        return FakeReference(self, path)
+
+    def load(self, data: dict):
+        # Как в RTDB: массивы хранятся объектами с ключами "0", "1", ...
+        self.data = self._resolve([], json.loads(json.dumps(data)))
+
+    def _request(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def split(path):
+        return [part for part in str(path).split("/") if part]
+
+    def read(self, parts):
+        node = self.data
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return json.loads(json.dumps(node))
+
+    def write(self, parts, value):
+        value = self._resolve(parts, value)
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        if value is None or value == {}:
+            node.pop(parts[-1], None)
+            self._prune(parts[:-1])
+        else:
+            node[parts[-1]] = value
+
+    def _prune(self, parts):
+        # Как в RTDB: пустые узлы не хранятся
+        while parts:
+            parent = self.data
+            for part in parts[:-1]:
+                parent = parent.get(part, {})
+            if parent.get(parts[-1]) == {}:
+                parent.pop(parts[-1], None)
+                parts = parts[:-1]
+            else:
+                break
+
+    def _resolve(self, parts, value):
+        # ServerValue: {".sv": {"increment": n}}
+        if isinstance(value, dict):
+            if ".sv" in value:
+                current = self.read(parts)
+                return (current if isinstance(current, (int, float)) else 0) + value[".sv"]["increment"]
+            resolved = {}
+            for key, child in value.items():
+                child = self._resolve(parts + [key], child)
+                if child is not None and child != {}:
+                    resolved[str(key)] = child
+            return resolved
+        if isinstance(value, list):
+            return self._resolve(parts, {str(i): child for i, child in enumerate(value)})
+        return value
+
+class FakeReference:
+    def __init__(self, database: FakeDatabase, path: str):
+        self.database = database
+        self.parts = FakeDatabase.split(path)
+
+    @property
+    def key(self):
+        return self.parts[-1] if self.parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self.parts)
+
+    def child(self, path):
+        return FakeReference(self.database, "/".join(self.parts + FakeDatabase.split(path)))
+
+    def get(self, etag=False, shallow=False):
+        self.database._request()
+        with self.database._lock:
+            value = self.database.read(self.parts)
+        if etag:
+            return value, make_etag(value)
+        if shallow and isinstance(value, dict):
+            return {key: True if isinstance(child, dict) else child for key, child in value.items()}
+        return value
+
+    def set_if_unchanged(self, expected_etag, value):
+        self.database._request()
+        with self.database._lock:
+            current = self.database.read(self.parts)
+            if make_etag(current) != expected_etag:
+                return False, current, make_etag(current)
+            self.database.write(self.parts, value)
+            current = self.database.read(self.parts)
+            return True, current, make_etag(current)
+
+    def transaction(self, transaction_update):
+        # Как в SDK: чтение с ETag и условная запись до успеха
+        value, etag = self.get(etag=True)
+        for _ in range(25):
+            new_value = transaction_update(value)
+            success, value, etag = self.set_if_unchanged(etag, new_value)
+            if success:
+                return value
+        raise RuntimeError("Transaction aborted")
+
+    def set(self, value):
+        self.database._request()
+        with self.database._lock:
+            self.database.write(self.parts, value)
+
+    def update(self, value):
+        self.database._request()
+        with self.database._lock:
+            for key, child in value.items():
+                self.database.write(self.parts + FakeDatabase.split(key), child)
+
+    def delete(self):
+        self.database._request()
+        with self.database._lock:
+            self.database.write(self.parts, None)
+
+    def push(self, value=""):
+        new_ref = self.child(generate_push_key())
+        new_ref.set(value)
+        return new_ref
+
+    def order_by_key(self):
+        return FakeQuery(self, "$key")
+
+    def order_by_value(self):
+        return FakeQuery(self, "$value")
+
+    def order_by_child(self, path):
+        return FakeQuery(self, path)
+
+def make_etag(value):
+    return hashlib.md5(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+class FakeQuery:
+    def __init__(self, ref: FakeReference, order_by: str):
+        self.ref = ref
+        self.order_by = order_by
+        self.params = {}
+
+    def _with(self, name, value):
+        self.params[name] = value
+        return self
+
+    def start_at(self, value):
+        return self._with("start_at", value)
+
+    def end_at(self, value):
+        return self._with("end_at", value)
+
+    def equal_to(self, value):
+        return self._with("equal_to", value)
+
+    def limit_to_first(self, value):
+        return self._with("limit_to_first", value)
+
+    def limit_to_last(self, value):
+        return self._with("limit_to_last", value)
+
+    def get(self):
+        return filter_children(self.ref.get() or {}, self.order_by, **self.params)
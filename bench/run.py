@@ -0,0 +1,250 @@
+# Бенчмарк команд бота без Discord и продакшн-Firebase.
+# Запуск из корня репозитория:
+#   python -m bench.run --sizes 100,1000,10000 --iterations 50 --db-latency-ms 30
+# С --backend rest запросы идут через rtdb_rest.RestBackend в локальную заглушку bench/stub_rtdb.py
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench.fake_discord import FakeChannel, FakeContext, FakeGuild, FakeInteraction, FakeUser
+from bench.fake_firebase import FakeDatabase
+from db_cache import generate_push_key
+from models import DATE_FORMAT_VERSION, REPRIMAND_FORMAT_VERSION
+
+FIRST_USER_ID = 10 ** 17
+FIRST_STATIC_ID = 1000
+
+def import_bot(database: FakeDatabase):
+    # main.py при импорте подключается к Firebase — подменяем SDK на базу в памяти
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    import firebase_admin
+    from firebase_admin import credentials, db
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    credentials.Certificate = lambda *args, **kwargs: None
+    db.reference = database.reference
+    import main
+    logging.getLogger().setLevel(logging.WARNING)
+    return main
+
+def build_dataset(size: int, now: datetime):
+    # Даты — секунды эпохи, как после migrate_date_formats
+    data = {"admins": {}, "user_stats": {}, "user_stats_daily": {}, "reprimands": {}, "user_events": {}, "events": {},
+            "meta": {"date_format_version": DATE_FORMAT_VERSION, "reprimand_format_version": REPRIMAND_FORMAT_VERSION}}
+    timestamp = int(now.timestamp())
+    for i in range(size):
+        user_id = str(FIRST_USER_ID + i)
+        static_id = str(FIRST_STATIC_ID + i)
+        data["admins"][static_id] = {
+            "static_id": static_id,
+            "nickname": f"Admin_{i}",
+            "entry_method": "Обзвон",
+            "level": 1 + i % 10,
+            "date_added": timestamp,
+            "user_id": user_id,
+            "date_joined": timestamp
+        }
+        data["user_stats"][static_id] = {
+            "name": f"Admin_{i}",
+            "total_minutes": 600 + i,
+            "total_reports": 40 + i % 17,
+            "last_updated": timestamp,
+            "last_entry": {"date": timestamp, "added_minutes": 60, "added_reports": 5}
+        }
+        data["user_stats_daily"][static_id] = {
+            (now - timedelta(days=day)).strftime('%Y-%m-%d'): {"minutes": 60, "reports": 5}
+            for day in range(30)
+        }
+        data["user_events"][user_id] = {"total_events": i % 5}
+        if i % 10 == 0:
+            reprimand = {
+                "reason": "bench",
+                "date": timestamp,
+                "expiration_date": int((now + timedelta(days=7)).timestamp()),
+                "active": True,
+                "issuer_id": str(FIRST_USER_ID),
+                "type": "oral"
+            }
+            data["reprimands"][user_id] = {
+                "reprimands": {generate_push_key(): reprimand for _ in range(2)},
+                "active_oral": 2,
+                "active_strict": 0
+            }
+    for i in range(50):
+        data["events"][f"event{i:04d}"] = {
+            "name": f"event {i}",
+            "time": "12:00",
+            "timestamp": int((now - timedelta(days=i + 1)).timestamp()),
+            "completed_at": int((now - timedelta(days=i + 1)).timestamp()),
+            "creator_id": str(FIRST_USER_ID),
+            "participants": [FIRST_USER_ID + 1],
+            "active": False
+        }
+    return data
+
+def reset_bot_state(main):
+    from event_state import EventState
+    from leaderboard import Leaderboard
+    from scheduler import DeadlineScheduler
+    main.db_cache.clear()
+    main.ADMIN_INDEX.clear()
+    main.admin_index_loaded = False
+    main.event_state = EventState(timedelta(minutes=main.EVENT_COOLDOWN_MINUTES), main.EVENT_TRACKS)
+    main.event_scheduler = DeadlineScheduler(main.complete_event, "events")
+    main.reprimand_scheduler = DeadlineScheduler(main.expire_reprimands, "reprimands")
+    main.reprimand_scheduler_loaded = False
+    main.leaderboard = Leaderboard()
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class Bench:
+    def __init__(self, main, database: FakeDatabase, size: int, discord_latency: float, rng: random.Random):
+        self.main = main
+        self.database = database
+        self.size = size
+        self.discord_latency = discord_latency
+        self.rng = rng
+        self.channels = {}
+        main.bot.get_channel = self.get_channel
+        self.admin_role = main.ADMIN_ROLES[0]
+        self.allkick_role = main.ALLKICK_ROLES[0]
+        self.guild = FakeGuild(main.GUILD_ID)
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self.discord_latency)
+        return self.channels[channel_id]
+
+    def random_user(self, role_ids=()):
+        index = self.rng.randrange(self.size)
+        user = FakeUser(FIRST_USER_ID + index, role_ids, name=f"Admin_{index}")
+        self.guild.members[user.id] = user
+        return user
+
+    def interaction(self, user):
+        return FakeInteraction(user, self.guild, self.get_channel(0), self.discord_latency)
+
+    def context(self, channel_id, mentions=()):
+        author = self.random_user([self.admin_role, self.allkick_role])
+        return FakeContext(author, self.guild, self.get_channel(channel_id), mentions)
+
+    async def menu(self):
+        await self.main.menu.callback(self.interaction(self.random_user()))
+
+    async def view_stats(self):
+        await self.main.view_stats.callback(self.interaction(self.random_user([self.admin_role])), self.random_user())
+
+    async def import_stats(self):
+        lines = []
+        for _ in range(min(200, self.size)):
+            static_id = FIRST_STATIC_ID + self.rng.randrange(self.size)
+            # Имя без "_" и цифр: по нему STATS_SPLIT_RE находит начало записи
+            lines.append(f"Admin | #{static_id} | {self.rng.randrange(10)} ч. {self.rng.randrange(60)} м. | {self.rng.randrange(30)}")
+        await self.main.import_stats.callback(self.interaction(self.random_user([self.admin_role])), " ".join(lines))
+
+    async def event(self):
+        ctx = self.context(self.main.EVENT_CHANNEL_ID, mentions=[self.random_user()])
+        await self.main.create_event.callback(ctx)
+
+    async def leaderboard(self):
+        interaction = self.interaction(self.random_user([self.admin_role]))
+        await self.main.leaderboard_command.callback(interaction, "minutes", "7d", 1 + self.rng.randrange(max(1, self.size // 10)))
+
+    async def warnings(self):
+        member = FakeUser(FIRST_USER_ID + self.rng.randrange(0, self.size, 10))
+        await self.main.reprimand_list.callback(self.context(self.main.PUNISHMENTS_CHANNEL_ID), member)
+
+    async def expire_reprimands(self):
+        await self.main.expire_reprimands(str(FIRST_USER_ID + self.rng.randrange(0, self.size, 10)))
+
+    async def startup(self):
+        reset_bot_state(self.main)
+        await self.main.migrate_date_formats()
+        await self.main.migrate_reprimand_storage()
+        await self.main.load_admin_index()
+        await self.main.load_events()
+        await self.main.load_reprimand_expiry()
+        await self.main.load_leaderboard()
+
+    async def measure(self, name, scenario, iterations):
+        latencies = []
+        round_trips = []
+        for _ in range(iterations):
+            before = self.database.round_trips
+            started = time.perf_counter()
+            await scenario()
+            latencies.append((time.perf_counter() - started) * 1000)
+            round_trips.append(self.database.round_trips - before)
+        return {
+            "command": name,
+            "size": self.size,
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "round_trips": sum(round_trips) / len(round_trips)
+        }
+
+SCENARIOS = ["/menu", "/view_stats", "/import_stats", "/leaderboard", "!event", "!warnings", "expire_reprimands"]
+
+async def run(sizes, iterations, db_latency, discord_latency, seed, backend="sdk"):
+    database = FakeDatabase()
+    stub = None
+    if backend == "rest":
+        from bench import stub_rtdb
+        stub, url = await stub_rtdb.start(database)
+        os.environ.update(FIREBASE_BACKEND="rest", FIREBASE_REST_URL=url, FIREBASE_REST_NO_AUTH="1")
+    main = import_bot(database)
+    try:
+        return await run_scenarios(main, database, sizes, iterations, db_latency, discord_latency, seed)
+    finally:
+        await main.outbox.flush()
+        await main.firebase_backend.close()
+        if stub is not None:
+            await stub.cleanup()
+
+async def run_scenarios(main, database, sizes, iterations, db_latency, discord_latency, seed):
+    results = []
+    for size in sizes:
+        rng = random.Random(seed)
+        database.latency = 0
+        database.load(build_dataset(size, datetime.now(main.MSK)))
+        database.latency = db_latency
+        bench = Bench(main, database, size, discord_latency, rng)
+        results.append(await bench.measure("startup", bench.startup, 1))
+        scenarios = {
+            "/menu": bench.menu,
+            "/view_stats": bench.view_stats,
+            "/import_stats": bench.import_stats,
+            "/leaderboard": bench.leaderboard,
+            "!event": bench.event,
+            "!warnings": bench.warnings,
+            "expire_reprimands": bench.expire_reprimands
+        }
+        for name in SCENARIOS:
+            results.append(await bench.measure(name, scenarios[name], max(1, iterations // 10) if name == "/import_stats" else iterations))
+    return results
+
+def print_results(results):
+    print(f"{'command':<20}{'admins':>8}{'p50, ms':>12}{'p99, ms':>12}{'DB trips':>10}")
+    for row in results:
+        print(f"{row['command']:<20}{row['size']:>8}{row['p50']:>12.1f}{row['p99']:>12.1f}{row['round_trips']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк команд бота на фейковых Firebase и Discord")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Размеры состава админов через запятую")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=30.0, help="Задержка одного запроса к Firebase")
+    parser.add_argument("--discord-latency-ms", type=float, default=50.0, help="Задержка одного HTTP-запроса к Discord")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=("sdk", "rest"), default="sdk", help="Бэкенд Firebase: SDK в потоках или REST-клиент")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = asyncio.run(run(sizes, args.iterations, args.db_latency_ms / 1000, args.discord_latency_ms / 1000, args.seed, args.backend))
+    print_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Локальная заглушка REST API Realtime Database поверх FakeDatabase — для
+# проверки rtdb_rest.RestBackend без Firebase. Отдельный запуск:
+#   python -m bench.stub_rtdb --port 9000
+# и в окружении бота FIREBASE_BACKEND=rest FIREBASE_REST_URL=http://127.0.0.1:9000 FIREBASE_REST_NO_AUTH=1
+import argparse
+import asyncio
+import json
+
+from aiohttp import web
+
+from bench.fake_firebase import FakeDatabase
+
+QUERY_PARAMS = {
+    "startAt": "start_at",
+    "endAt": "end_at",
+    "equalTo": "equal_to",
+    "limitToFirst": "limit_to_first",
+    "limitToLast": "limit_to_last"
+}
+
+def make_app(database: FakeDatabase):
+    async def handle(request: web.Request):
+        path = request.match_info["path"]
+        if not path.endswith(".json"):
+            return web.json_response({"error": "404 Not Found"}, status=404)
+        ref = database.reference(path[:-len(".json")])
+        params = request.query
+        try:
+            body = json.loads(await request.text()) if request.method in ("PUT", "PATCH") else None
+        except ValueError:
+            return web.json_response({"error": "Invalid data; couldn't parse JSON object."}, status=400)
+        # FakeDatabase блокирует поток на время задержки — уводим с цикла событий
+        if_match = request.headers.get("if-match")
+        if request.method == "GET" and request.headers.get("X-Firebase-ETag") == "true":
+            result, etag = await asyncio.to_thread(ref.get, True)
+            return web.json_response(result, headers={"ETag": etag})
+        elif if_match is not None and request.method in ("PUT", "DELETE"):
+            success, result, etag = await asyncio.to_thread(ref.set_if_unchanged, if_match, body)
+            if not success:
+                return web.json_response(result, status=412, headers={"ETag": etag})
+            result = body
+        elif request.method == "GET":
+            result = await asyncio.to_thread(read, ref, params)
+        elif request.method == "PUT":
+            await asyncio.to_thread(ref.set, body)
+            result = body
+        elif request.method == "PATCH":
+            await asyncio.to_thread(ref.update, body)
+            result = body
+        elif request.method == "DELETE":
+            await asyncio.to_thread(ref.delete)
+            result = None
+        else:
+            return web.json_response({"error": "405 Method Not Allowed"}, status=405)
+        if params.get("print") == "silent":
+            return web.Response(status=204)
+        return web.json_response(result)
+
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handle)
+    return app
+
+def read(ref, params):
+    if "orderBy" in params:
+        order_by = json.loads(params["orderBy"])
+        if order_by == "$key":
+            query = ref.order_by_key()
+        elif order_by == "$value":
+            query = ref.order_by_value()
+        else:
+            query = ref.order_by_child(order_by)
+        for name, method in QUERY_PARAMS.items():
+            if name in params:
+                query = getattr(query, method)(json.loads(params[name]))
+        return dict(query.get())
+    return ref.get(shallow=params.get("shallow") == "true")
+
+async def start(database: FakeDatabase, host: str = "127.0.0.1", port: int = 0):
+    runner = web.AppRunner(make_app(database))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+async def serve(host: str, port: int, data_file: str = None):
+    database = FakeDatabase()
+    if data_file:
+        with open(data_file, encoding="utf-8") as f:
+            database.load(json.load(f))
+    runner, url = await start(database, host, port)
+    print(f"Заглушка RTDB слушает {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка REST API Realtime Database в памяти")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--data", help="JSON-файл с начальными данными")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.data))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import asyncio
+import copy
+import json
+import random
+import time
+from collections import OrderedDict
+
+import metrics
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_last_push_time = 0
+_last_random_chars = []
+
+def generate_push_key():
+    # Ключ в формате push() Firebase, но без запроса к серверу: 8 символов
+    # времени в мс + 12 случайных, в пределах одной мс — монотонно растут
+    global _last_push_time
+    now = int(time.time() * 1000)
+    duplicate_time = now == _last_push_time
+    _last_push_time = now
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[now % 64])
+        now //= 64
+    if not duplicate_time:
+        _last_random_chars[:] = [random.randrange(64) for _ in range(12)]
+    else:
+        i = 11
+        while i >= 0 and _last_random_chars[i] == 63:
+            _last_random_chars[i] = 0
+            i -= 1
+        if i >= 0:
+            _last_random_chars[i] += 1
+    return "".join(reversed(time_chars)) + "".join(PUSH_CHARS[c] for c in _last_random_chars)
+
+def push_key_time(key):
+    # Обратное к generate_push_key: время создания в мс из первых 8 символов
+    if len(key) != 20 or any(char not in PUSH_CHARS for char in key[:8]):
+        return None
+    value = 0
+    for char in key[:8]:
+        value = value * 64 + PUSH_CHARS.index(char)
+    return value
+
+def increment(delta):
+    # Серверный инкремент RTDB (ServerValue.increment)
+    return {".sv": {"increment": delta}}
+
+# Синхронный Admin SDK за асинхронным интерфейсом бэкенда: каждый вызов
+# уходит в пул потоков (executor или общий asyncio.to_thread).
+class SdkBackend:
+    def __init__(self, root, executor=None):
+        self.root = root
+        self.executor = executor
+
+    def ref(self, path):
+        return self.root.child(path) if path else self.root
+
+    async def _run(self, func, *args):
+        if self.executor is not None:
+            return await self.executor.run(func, *args)
+        return await asyncio.to_thread(func, *args)
+
+    async def get(self, path, shallow=False):
+        if shallow:
+            return await self._run(lambda: self.ref(path).get(shallow=True))
+        return await self._run(self.ref(path).get)
+
+    async def set(self, path, value):
+        await self._run(self.ref(path).set, value)
+
+    async def update(self, path, value):
+        await self._run(self.ref(path).update, value)
+
+    async def delete(self, path):
+        await self._run(self.ref(path).delete)
+
+    async def transaction(self, path, update):
+        # SDK сам повторяет update при конкурентной записи (по ETag)
+        return await self._run(self.ref(path).transaction, update)
+
+    async def query(self, path, order_by, start_at, end_at, equal_to, limit_to_first, limit_to_last):
+        return await self._run(self._query, path, order_by, start_at, end_at, equal_to, limit_to_first, limit_to_last)
+
+    def _query(self, path, order_by, start_at, end_at, equal_to, limit_to_first, limit_to_last):
+        ref = self.ref(path)
+        if order_by == "$key":
+            query = ref.order_by_key()
+        elif order_by == "$value":
+            query = ref.order_by_value()
+        else:
+            query = ref.order_by_child(order_by)
+        if start_at is not None:
+            query = query.start_at(start_at)
+        if end_at is not None:
+            query = query.end_at(end_at)
+        if equal_to is not None:
+            query = query.equal_to(equal_to)
+        if limit_to_first is not None:
+            query = query.limit_to_first(limit_to_first)
+        if limit_to_last is not None:
+            query = query.limit_to_last(limit_to_last)
+        return dict(query.get() or {})
+
+    def stats(self):
+        return {"backend": "sdk"}
+
+    async def close(self):
+        pass
+
+# Кэш чтений Firebase поверх бэкенда (SdkBackend или rtdb_rest.RestBackend):
+# TTL по префиксу пути, LRU-вытеснение по количеству записей и объему,
+# инвалидация при записи через кэш. Одновременные промахи по одному пути
+# (несколько админов открыли статистику одного человека) ждут одно чтение.
+class DBCache:
+    def __init__(self, backend, ttls=None, default_ttl=30, max_entries=2048, max_bytes=4 * 1024 * 1024):
+        self.backend = backend
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (expires_at, raw_json, size)
+        self._bytes = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.mirror_reads = 0
+        self.coalesced = 0
+        self._inflight = {}  # ключ кэша -> [задача чтения, число присоединившихся]
+        self.mirrors = []
+
+    @staticmethod
+    def normalize(path):
+        return "/".join(part for part in str(path).split("/") if part)
+
+    def ttl_for(self, path):
+        # Самый длинный совпавший префикс ("reprimands", "user_events/123", ...)
+        parts = path.split("/")
+        for i in range(len(parts), 0, -1):
+            ttl = self.ttls.get("/".join(parts[:i]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+    def attach_mirror(self, mirror):
+        self.mirrors.append(mirror)
+
+    def _mirror_for(self, path, synced=True):
+        for mirror in self.mirrors:
+            if mirror.covers(path) and (mirror.synced or not synced):
+                return mirror
+        return None
+
+    def _read_mirror(self, path):
+        mirror = self._mirror_for(path)
+        if mirror is None:
+            return False, None
+        self.mirror_reads += 1
+        return True, mirror.read(path)
+
+    def _write_mirrors(self, path, value):
+        # Применяем запись к зеркалам до запроса, чтобы эхо от сервера пришло поверх
+        mirror = self._mirror_for(path, synced=False)
+        if mirror is not None:
+            mirror.apply_local(path, value)
+        return mirror
+
+    async def _write(self, mirrored, coro):
+        try:
+            await self._call(coro)
+        except Exception:
+            for mirror in {mirror for mirror in mirrored if mirror is not None}:
+                asyncio.create_task(mirror.resync("ошибка записи"))
+            raise
+
+    async def get(self, path):
+        path = self.normalize(path)
+        found, value = self._read_mirror(path)
+        if found:
+            return value
+        found, value = self._lookup(path)
+        if found:
+            return value
+        return await self._single_flight(path, lambda: self._fetch(path, path, self.backend.get(path)))
+
+    async def fetch(self, path):
+        # Чтение мимо кэша — для больших разовых выборок при старте
+        path = self.normalize(path)
+        found, value = self._read_mirror(path)
+        if found:
+            return value
+        return await self._call(self.backend.get(path))
+
+    async def keys(self, path):
+        # Только ключи детей (shallow), без их содержимого; мимо кэша
+        path = self.normalize(path)
+        found, value = self._read_mirror(path)
+        if found:
+            return list(value) if isinstance(value, dict) else []
+        return list(await self._call(self.backend.get(path, shallow=True)) or {})
+
+    async def query(self, path, order_by="$key", start_at=None, end_at=None, equal_to=None, limit_to_first=None, limit_to_last=None):
+        # Запрос с фильтрацией на стороне сервера; кэшируется под ключом "path?параметры"
+        path = self.normalize(path)
+        params = (order_by, start_at, end_at, equal_to, limit_to_first, limit_to_last)
+        mirror = self._mirror_for(path)
+        if mirror is not None:
+            self.mirror_reads += 1
+            return mirror.query(path, order_by, start_at=start_at, end_at=end_at, equal_to=equal_to,
+                                limit_to_first=limit_to_first, limit_to_last=limit_to_last)
+        cache_key = f"{path}?{json.dumps(params, ensure_ascii=False)}"
+        found, value = self._lookup(cache_key)
+        if found:
+            return value
+        return await self._single_flight(cache_key, lambda: self._fetch(cache_key, path, self.backend.query(path, *params)))
+
+    async def _fetch(self, key, ttl_path, coro):
+        generation = self._generation
+        value = await self._call(coro)
+        # Если пока шло чтение была запись, результат мог устареть — не кэшируем
+        if generation == self._generation:
+            self._store(key, value, ttl_path=ttl_path)
+        return value
+
+    async def _single_flight(self, key, fetch):
+        # Пока чтение по ключу идет, остальные ждут его же результат. Задача
+        # общая, поэтому отмена одного ожидающего не прерывает чтение для других
+        flight = self._inflight.get(key)
+        if flight is not None:
+            flight[1] += 1
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(flight[0]))
+        task = asyncio.ensure_future(fetch())
+        flight = self._inflight[key] = [task, 0]
+        task.add_done_callback(lambda done: self._land(key, done))
+        value = await asyncio.shield(task)
+        # Каждый получает свою копию: результат потом правят на месте
+        return copy.deepcopy(value) if flight[1] else value
+
+    def _land(self, key, task):
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Ошибку уже получили ожидающие; не пишем "never retrieved"
+
+    async def set(self, path, value):
+        path = self.normalize(path)
+        self.invalidate(path)
+        await self._write([self._write_mirrors(path, value)], self.backend.set(path, value))
+
+    async def update(self, path, value):
+        path = self.normalize(path)
+        mirrored = []
+        for key, child in value.items():
+            child_path = self.normalize(f"{path}/{key}")
+            self.invalidate(child_path)
+            mirrored.append(self._write_mirrors(child_path, child))
+        await self._write(mirrored, self.backend.update(path, value))
+
+    async def delete(self, path):
+        path = self.normalize(path)
+        self.invalidate(path)
+        await self._write([self._write_mirrors(path, None)], self.backend.delete(path))
+
+    async def transaction(self, path, update):
+        # Чтение-изменение-запись узла без гонок: update(текущее значение) -> новое,
+        # при конкурентной записи вызывается повторно с новым значением
+        path = self.normalize(path)
+        self.invalidate(path)
+        mirror = self._mirror_for(path, synced=False)
+        try:
+            value = await self._call(self.backend.transaction(path, update))
+        except Exception:
+            if mirror is not None:
+                asyncio.create_task(mirror.resync("ошибка транзакции"))
+            raise
+        self.invalidate(path)
+        if mirror is not None:
+            mirror.apply_local(path, value)
+        return value
+
+    async def push(self, path, value):
+        path = self.normalize(path)
+        # Ключ генерируем сами: запись становится обычным идемпотентным set
+        key = generate_push_key()
+        await self.set(f"{path}/{key}", value)
+        return key
+
+    async def _call(self, coro):
+        return await metrics.timed_firebase(coro)
+
+    def invalidate(self, path):
+        path = self.normalize(path)
+        self._generation += 1
+        # Сам путь, все предки (содержат его) и все потомки, включая кэш запросов по ним
+        parts = path.split("/") if path else []
+        ancestors = {"/".join(parts[:i]) for i in range(len(parts) + 1)}
+        prefix = path + "/" if path else ""
+        for key in list(self._entries):
+            base = key.split("?", 1)[0]
+            if base in ancestors or base.startswith(prefix):
+                self._drop(key)
+        # Идущее чтение могло начаться до записи: новые запросы к нему не присоединяются
+        for key in list(self._inflight):
+            base = key.split("?", 1)[0]
+            if base in ancestors or base.startswith(prefix):
+                del self._inflight[key]
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+        self._bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "mirror_reads": self.mirror_reads,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "mirrors": {mirror.path: mirror.stats() for mirror in self.mirrors},
+            "backend": self.backend.stats()
+        }
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, json.loads(entry[1])
+            self._drop(key)
+        self.misses += 1
+        return False, None
+
+    def _store(self, path, value, ttl_path=None):
+        raw = json.dumps(value, ensure_ascii=False)
+        size = len(raw.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._drop(path)
+        self._entries[path] = (time.monotonic() + self.ttl_for(ttl_path or path), raw, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[2]
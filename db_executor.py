@@ -0,0 +1,91 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Histogram
+
+# Отдельные пулы потоков для синхронного SDK Firebase вместо общего пула
+# asyncio.to_thread. Интерактивные команды и фоновые задачи (импорт, планировщики,
+# загрузка при старте) идут в разные полосы и не занимают потоки друг друга.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_current_lane = contextvars.ContextVar("firebase_lane", default=INTERACTIVE)
+
+class Lane:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"firebase-{name}")
+        self.wait = Histogram()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def _job(self, submitted: float, func, args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait.observe((time.perf_counter() - submitted) * 1000)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, func, *args):
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, self._job, time.perf_counter(), func, args)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "wait_p50_ms": self.wait.percentile(0.50),
+            "wait_p99_ms": self.wait.percentile(0.99),
+            "wait_max_ms": round(self.wait.max, 2)
+        }
+
+class FirebaseExecutor:
+    def __init__(self, interactive_workers: int = 8, background_workers: int = 2):
+        self.lanes = {
+            INTERACTIVE: Lane(INTERACTIVE, interactive_workers),
+            BACKGROUND: Lane(BACKGROUND, background_workers)
+        }
+
+    async def run(self, func, *args):
+        # Полоса берется из контекста вызывающей корутины
+        return await self.lanes[_current_lane.get()].run(func, *args)
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.pool.shutdown(wait=False)
+
+@contextlib.contextmanager
+def background_lane():
+    token = _current_lane.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+def background(func):
+    # Все запросы к Firebase внутри func (и порожденных задач) идут в фоновую полосу
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with background_lane():
+            return await func(*args, **kwargs)
+    return wrapper
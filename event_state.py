@@ -0,0 +1,102 @@
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+
+# Состояние ивентов в памяти и расписание: активные (не завершенные) ивенты по
+# дорожкам, каждая — список (время начала, event_id) по возрастанию, и время
+# последнего завершения на дорожке. Ивенты одной дорожки должны отстоять друг от друга
+# не меньше чем на кулдаун, поэтому занятое ивентом окно — (start - cooldown,
+# start + cooldown). Проверка конфликта — один bisect по дорожке, поиск
+# ближайшего свободного слота перескакивает через цепочку занятых окон.
+# Строится одним чтением events и дальше поддерживается при создании, отмене и
+# завершении ивентов, без обращений к базе.
+SLOT_STEP_MINUTES = 5  # Шаг выбора минут в TimeSelectView
+
+class EventState:
+    def __init__(self, cooldown: timedelta = timedelta(minutes=50), tracks: int = 1):
+        self.cooldown = cooldown
+        self.tracks = tracks
+        self.loaded = False
+        self._tracks = {}  # track -> [(event_time, event_id)] по возрастанию времени
+        self._events = {}  # event_id -> (track, event_time)
+        self._completed = {}  # track -> время последнего завершения
+
+    def load(self, events: list, tz):
+        # events — models.Event; время в них в секундах эпохи
+        self._tracks.clear()
+        self._events.clear()
+        self._completed.clear()
+        for event in events:
+            if event.active and event.timestamp is not None:
+                self.add(event.event_id, datetime.fromtimestamp(event.timestamp, tz), event.track)
+            elif not event.active and event.completed_at is not None:
+                self.mark_completed(None, datetime.fromtimestamp(event.completed_at, tz), event.track)
+        self.loaded = True
+
+    def add(self, event_id, event_time: datetime, track: int = 0):
+        self.remove(event_id)
+        self._events[event_id] = (track, event_time)
+        insort(self._tracks.setdefault(track, []), (event_time, event_id))
+
+    def remove(self, event_id):
+        booking = self._events.pop(event_id, None)
+        if booking is not None:
+            track, event_time = booking
+            self._tracks[track].remove((event_time, event_id))
+
+    def mark_completed(self, event_id, completed_at: datetime, track: int = 0):
+        booking = self._events.get(event_id)
+        if booking is not None:
+            track = booking[0]
+        self.remove(event_id)
+        if track not in self._completed or completed_at > self._completed[track]:
+            self._completed[track] = completed_at
+
+    @property
+    def last_completion_time(self):
+        return max(self._completed.values(), default=None)
+
+    def earliest_start(self, track: int, now: datetime):
+        # Кулдаун после последнего завершенного ивента дорожки
+        completed_at = self._completed.get(track)
+        if completed_at is None:
+            return now
+        return max(now, completed_at + self.cooldown)
+
+    def _conflict(self, track: int, event_time: datetime):
+        # Первый ивент дорожки, начинающийся позже event_time - cooldown
+        bookings = self._tracks.get(track, [])
+        idx = bisect_right(bookings, event_time - self.cooldown, key=lambda booking: booking[0])
+        if idx < len(bookings) and bookings[idx][0] < event_time + self.cooldown:
+            return bookings[idx]
+        return None
+
+    def conflict(self, event_time: datetime):
+        # Ближайший мешающий ивент, если все дорожки заняты; None, если ивенты не мешают
+        conflicts = [self._conflict(track, event_time) for track in range(self.tracks)]
+        if any(booking is None for booking in conflicts):
+            return None
+        return min(conflicts)
+
+    def free_track(self, event_time: datetime, now: datetime):
+        for track in range(self.tracks):
+            if event_time >= self.earliest_start(track, now) and self._conflict(track, event_time) is None:
+                return track
+        return None
+
+    def next_free_slot(self, after: datetime, now: datetime, until: datetime = None):
+        # (время, дорожка) ближайшего свободного слота на сетке минут не раньше after
+        best = None
+        for track in range(self.tracks):
+            candidate = round_up_to_step(max(after, self.earliest_start(track, now)))
+            while (booking := self._conflict(track, candidate)) is not None:
+                candidate = round_up_to_step(booking[0] + self.cooldown)
+            if best is None or candidate < best[0]:
+                best = (candidate, track)
+        if best is None or (until is not None and best[0] > until):
+            return None
+        return best
+
+def round_up_to_step(moment: datetime):
+    step = timedelta(minutes=SLOT_STEP_MINUTES)
+    floor = moment.replace(minute=moment.minute - moment.minute % SLOT_STEP_MINUTES, second=0, microsecond=0)
+    return floor if floor == moment else floor + step
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Чтения для ответа на команду: независимые шаги плана идут параллельно, ответ
+# ждет самый долгий из них, а не их сумму. Discord ждет ответа на interaction
+# 3 секунды; если шаги не успели за RESPONSE_BUDGET с момента создания
+# interaction, отвечаем defer и ждем дальше до FETCH_TIMEOUT. Шаги, которые не
+# успели или упали, попадают в missing — команда показывает то, что есть.
+RESPONSE_BUDGET = 2.0  # Секунд на чтения до defer, с запасом на саму отправку
+FETCH_TIMEOUT = 10.0  # Секунд на весь план, считая от запуска
+
+runs = 0
+deferred = 0
+partial = 0
+
+class FetchResult:
+    def __init__(self, values: dict, missing: set):
+        self.values = values
+        self.missing = missing
+
+    def get(self, name: str, default=None):
+        return self.values.get(name, default)
+
+class FetchPlan:
+    def __init__(self, name: str, budget: float = RESPONSE_BUDGET, timeout: float = FETCH_TIMEOUT):
+        self.name = name
+        self.budget = budget
+        self.timeout = timeout
+        self._steps = {}
+
+    def add(self, name: str, coro):
+        # Шаг, зависящий от другого, — одна корутина, которая сама читает по очереди
+        self._steps[name] = coro
+        return self
+
+    async def run(self, interaction: discord.Interaction, ephemeral: bool = True):
+        global runs, deferred, partial
+        runs += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = {name: asyncio.ensure_future(coro) for name, coro in self._steps.items()}
+        pending = set(tasks.values())
+        try:
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=self._budget_left(interaction))
+            if pending and not interaction.response.is_done():
+                log.info("%s: данные не готовы за %.1f с, откладываем ответ", self.name, self.budget)
+                await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+                deferred += 1
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=max(0.0, self.timeout - (loop.time() - started)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        values = {}
+        missing = set()
+        for name, task in tasks.items():
+            if task in pending:
+                log.warning("%s: шаг %s не успел за %.1f с", self.name, name, self.timeout)
+                missing.add(name)
+            elif task.cancelled() or task.exception() is not None:
+                log.error("%s: ошибка в шаге %s: %s", self.name, name, "отменен" if task.cancelled() else task.exception())
+                missing.add(name)
+            else:
+                values[name] = task.result()
+        if missing:
+            partial += 1
+        return FetchResult(values, missing)
+
+    def _budget_left(self, interaction):
+        # Бюджет считаем от создания interaction: часть уже ушла на доставку и очередь
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        return min(self.budget, max(0.0, self.budget - elapsed))
+
+async def respond(interaction: discord.Interaction, content: str = None, **kwargs):
+    # Ответ на interaction, даже если план уже ответил defer
+    if interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+
+def stats():
+    return {"runs": runs, "deferred": deferred, "partial": partial}
@@ -0,0 +1,110 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+# Рейтинги по user_stats в памяти. Каждый рейтинг — список (-очки, static_id)
+# по возрастанию: место — позиция в списке, страница — срез, изменение очков
+# одного пользователя — bisect и вставка. Строится одним чтением user_stats и
+# user_stats_daily при старте (дни старше окон при этом удаляются), дальше
+# обновляется импортом статистики.
+# Окна 7 и 30 дней держат дневные суммы последних дней и при смене дня
+# вычитают выпавшие из окна дни, не пересчитывая всех пользователей.
+METRICS = ("minutes", "reports")
+PERIODS = {"all": None, "7d": 7, "30d": 30}
+MAX_WINDOW_DAYS = max(days for days in PERIODS.values() if days)
+
+class RankedBoard:
+    def __init__(self):
+        self._entries = []  # [(-score, static_id)]
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, static_id: str, score: int):
+        old = self._scores.pop(static_id, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, (-old, static_id))]
+        # Пользователи без очков в рейтинг не попадают
+        if score > 0:
+            self._scores[static_id] = score
+            insort(self._entries, (-score, static_id))
+
+    def add(self, static_id: str, delta: int):
+        self.set(static_id, self._scores.get(static_id, 0) + delta)
+
+    def score(self, static_id: str):
+        return self._scores.get(static_id, 0)
+
+    def rank(self, static_id: str):
+        score = self._scores.get(static_id)
+        if score is None:
+            return None
+        return bisect_left(self._entries, (-score, static_id)) + 1
+
+    def page(self, page: int, size: int):
+        # [(место, static_id, очки)]
+        start = page * size
+        return [(start + i + 1, static_id, -score) for i, (score, static_id) in enumerate(self._entries[start:start + size])]
+
+class Leaderboard:
+    def __init__(self):
+        self.boards = {(metric, period): RankedBoard() for metric in METRICS for period in PERIODS}
+        self.names = {}
+        self._days = {}  # date -> {static_id: [минуты, репорты]} за последние MAX_WINDOW_DAYS дней
+        self._today = None
+        self.loaded = False
+
+    def set_totals(self, static_id: str, name: str, minutes: int, reports: int):
+        if name:
+            self.names[static_id] = name
+        self.boards[("minutes", "all")].set(static_id, minutes)
+        self.boards[("reports", "all")].set(static_id, reports)
+
+    def add_daily(self, static_id: str, buckets: dict, today: date):
+        # buckets — {date: (минуты, репорты)}; окна пользователя меняются одним add на рейтинг
+        self.roll(today)
+        starts = {period: window_start(today, days) for period, days in PERIODS.items() if days}
+        oldest = window_start(today, MAX_WINDOW_DAYS)
+        sums = {period: [0, 0] for period in starts}
+        for day, (minutes, reports) in buckets.items():
+            if not oldest <= day <= today:
+                continue
+            bucket = self._days.setdefault(day, {}).setdefault(static_id, [0, 0])
+            bucket[0] += minutes
+            bucket[1] += reports
+            for period, start in starts.items():
+                if day >= start:
+                    sums[period][0] += minutes
+                    sums[period][1] += reports
+        for period, (minutes, reports) in sums.items():
+            if minutes:
+                self.boards[("minutes", period)].add(static_id, minutes)
+            if reports:
+                self.boards[("reports", period)].add(static_id, reports)
+
+    def roll(self, today: date):
+        # Вычитаем дни, выпавшие из окон с прошлой проверки
+        previous = self._today
+        if previous is not None and previous >= today:
+            return
+        self._today = today
+        if previous is None:
+            return
+        for day, buckets in list(self._days.items()):
+            for period, days in PERIODS.items():
+                if days and in_window(day, previous, days) and not in_window(day, today, days):
+                    for static_id, (minutes, reports) in buckets.items():
+                        self.boards[("minutes", period)].add(static_id, -minutes)
+                        self.boards[("reports", period)].add(static_id, -reports)
+            if not in_window(day, today, MAX_WINDOW_DAYS):
+                del self._days[day]
+
+    def board(self, metric: str, period: str, today: date):
+        self.roll(today)
+        return self.boards[(metric, period)]
+
+def window_start(today: date, days: int):
+    return today - timedelta(days=days - 1)
+
+def in_window(day: date, today: date, days: int):
+    return window_start(today, days) <= day <= today
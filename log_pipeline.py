@@ -0,0 +1,87 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime
+
+# Логирование без дискового ввода-вывода в цикле событий: логгеры кладут записи
+# в очередь (QueueHandler), а форматирование и запись в файл и консоль делает
+# фоновый поток QueueListener. Файл — JSON по строке на запись с ротацией по
+# размеру, консоль — прежний текстовый формат. Уровни задаются по подсистемам
+# строкой вида "INFO,discord=WARNING,mirror=DEBUG" (первый элемент без "=" —
+# уровень корневого логгера).
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+TEXT_DATE_FORMAT = '%H:%M %d:%m:%Y'
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, tz):
+        super().__init__()
+        self.tz = tz
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, self.tz).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, tz):
+        super().__init__(TEXT_FORMAT, TEXT_DATE_FORMAT)
+        self.tz = tz
+
+    def converter(self, created):
+        # Время самой записи в нужном поясе, а не момент форматирования
+        return datetime.fromtimestamp(created, self.tz).timetuple()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # В вызывающем потоке только подставляем аргументы (они могут измениться
+        # позже), а время, формат и трассировку оставляем фоновому потоку
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def parse_levels(spec: str):
+    # Опечатка в LOG_LEVELS не должна ронять бота при импорте: неизвестный уровень
+    # заменяем на INFO и возвращаем такие элементы, чтобы о них предупредить
+    known = logging.getLevelNamesMapping()
+    levels = {}
+    invalid = []
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = part.rpartition("=")
+        level = level.strip().upper()
+        if level not in known:
+            invalid.append(part)
+            level = "INFO"
+        levels[name.strip()] = known[level]
+    return levels, invalid
+
+def setup_logging(tz, levels: str = "INFO", log_file: str = "bot.log", max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter(tz))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(TextFormatter(tz))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    levels, invalid = parse_levels(levels)
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+    for part in invalid:
+        logging.getLogger(__name__).warning("Неизвестный уровень логирования «%s», используется INFO", part)
+    listener.start()
+    # Дописываем очередь при выходе
+    atexit.register(listener.stop)
+    return listener
@@ -5,29 +5,50 @@ import os
 from dotenv import load_dotenv
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, db
 from pytz import timezone
-import re
 import json
+import io
+import time
+import aiohttp
+from db_cache import DBCache, SdkBackend, generate_push_key, increment, push_key_time
+from rtdb_rest import RestBackend
+import metrics
+from mirror import RealtimeMirror
+import db_executor
+from collections import Counter
+from scheduler import DeadlineScheduler
+from event_state import EventState
+from leaderboard import MAX_WINDOW_DAYS, Leaderboard, window_start
+from stats_parser import STATS_SPLIT_RE, csv_stat_parser, format_minutes_to_hours, parse_stat_line
+from log_pipeline import setup_logging
+from outbox import ChannelOutbox
+from fetch_plan import FetchPlan, respond
+import fetch_plan
+from models import (
+    DATE_FORMAT_VERSION, DISPLAY_DATE_FORMAT, REPRIMAND_FORMAT_VERSION, Admin, Event, Reprimand, StatsEntry, UserStats,
+    as_dict, format_timestamp, now_timestamp, parse_events, parse_reprimands, parse_timestamp, reprimand_counters,
+    reprimands_to_db, to_datetime
+)
 
 MSK = timezone('Europe/Moscow')
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    datefmt='%H:%M %d:%m:%Y',
-    handlers=[
-        logging.FileHandler("bot.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-logging.Formatter.converter = lambda *args: datetime.now(MSK).timetuple()
-
 load_dotenv()
 
+# Настройка логирования: запись в файл (JSON-строки с ротацией) и консоль идет
+# в фоновом потоке; уровни по подсистемам, например LOG_LEVELS="INFO,discord=WARNING,mirror=DEBUG"
+setup_logging(
+    MSK,
+    levels=os.getenv("LOG_LEVELS", "INFO"),
+    log_file=os.getenv("LOG_FILE", "bot.log"),
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5"))
+)
+log = logging.getLogger("bot")
+
+DATABASE_URL = os.getenv("FIREBASE_DATABASE_URL", "https://crystal-stats-default-rtdb.firebaseio.com")
 # Получаем JSON-креденшелы из переменной окружения
 firebase_json = os.getenv('FIREBASE_CREDENTIALS')
 
@@ -36,7 +57,7 @@ if firebase_json:
         # Парсим JSON из строки, полученной из переменной окружения
         cred = credentials.Certificate(json.loads(firebase_json))
         firebase_admin.initialize_app(cred, {
-            'databaseURL': 'https://crystal-stats-default-rtdb.firebaseio.com'
+            'databaseURL': DATABASE_URL
         })
         print("Firebase подключен!")
     except Exception as e:
@@ -46,13 +67,50 @@ else:
     try:
         cred = credentials.Certificate("firebase-adminsdk.json")
         firebase_admin.initialize_app(cred, {
-            'databaseURL': 'https://crystal-stats-default-rtdb.firebaseio.com'
+            'databaseURL': DATABASE_URL
         })
         print("Firebase подключен через локальный файл!")
     except Exception as e:
         print(f"Ошибка: FIREBASE_CREDENTIALS не найден и локальный файл недоступен! {e}")
 
 db_ref = db.reference()
+# Свои пулы потоков для Firebase: интерактивные команды не ждут фоновые задачи
+firebase_executor = db_executor.FirebaseExecutor(
+    interactive_workers=int(os.getenv("FIREBASE_INTERACTIVE_WORKERS", "8")),
+    background_workers=int(os.getenv("FIREBASE_BACKGROUND_WORKERS", "2"))
+)
+
+def firebase_access_token():
+    # OAuth-токен сервисного аккаунта того же приложения firebase_admin
+    token = firebase_admin.get_app().credential.get_access_token()
+    expires_at = timezone('UTC').localize(token.expiry).timestamp() if token.expiry else time.time() + 3000
+    return token.access_token, expires_at
+
+# FIREBASE_BACKEND=rest — запросы через асинхронный REST-клиент с пулом соединений,
+# иначе синхронный SDK в пулах потоков. Прослушивание зеркал в обоих случаях через SDK.
+FIREBASE_BACKEND = os.getenv("FIREBASE_BACKEND", "sdk")
+if FIREBASE_BACKEND == "rest":
+    firebase_backend = RestBackend(
+        os.getenv("FIREBASE_REST_URL", DATABASE_URL),
+        token_provider=None if os.getenv("FIREBASE_REST_NO_AUTH") else firebase_access_token,
+        pool_size=int(os.getenv("FIREBASE_REST_POOL_SIZE", "32"))
+    )
+else:
+    firebase_backend = SdkBackend(db_ref, executor=firebase_executor)
+# Кэш чтений: TTL в секундах по префиксу пути, записи через кэш сбрасывают его
+db_cache = DBCache(firebase_backend, ttls={
+    "events": 15,
+    "user_events": 60,
+    "reprimands": 60,
+    "user_stats": 60,
+    "admins": 120,
+    "admins_by_discord": 300
+})
+# Поддеревья, которые держим в памяти через listen(): чтения по ним идут без сети
+MIRRORED_PATHS = ("events", "admins", "admins_by_discord", "reprimands")
+mirrors = [RealtimeMirror(db_ref, path) for path in MIRRORED_PATHS]
+for mirror in mirrors:
+    db_cache.attach_mirror(mirror)
 
 intents = discord.Intents.default()
 intents.members = True
@@ -60,6 +118,11 @@ intents.message_content = True
 intents.guilds = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
+metrics.install_discord_hooks(bot.http)
+# Сообщения в служебные каналы уходят через очереди каналов, команды их не ждут
+outbox = ChannelOutbox()
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.json")
+METRICS_DUMP_INTERVAL = 60  # Секунд между записями снимка метрик в файл
 
 TOKEN = os.getenv('DISCORD_TOKEN')
 if not TOKEN:
@@ -73,11 +136,13 @@ WELCOME_CHANNEL_ID = 1232400425345486949  # Канал для приветств
 PUNISHMENTS_CHANNEL_ID = 1232400465514336416  # Канал для выговоров
 EVENT_CHANNEL_ID = 1233825801003339948  # Канал для ивентов
 NOTIFICATION_CHANNEL_ID = 1348702274653913152  # ID канала для уведомлений
-EVENTS_REF = db_ref.child("events")  # Ссылка на события в Firebase
 EVENT_COOLDOWN_MINUTES = 50  # Кулдаун между ивентами в минутах
+EVENT_TRACKS = 1  # Сколько ивентов может идти параллельно (дорожек расписания)
+EVENT_BOOKING_DAYS = 7  # На сколько дней вперед можно запланировать ивент
+OWNER_ID = 310707269547458570  # Владелец бота
 
 async def get_join_date(member: discord.Member):
-    logging.info(f"Получение даты присоединения для {member.id}")
+    log.info("Получение даты присоединения для %s", member.id)
     join_date = member.joined_at
     if join_date:
         join_date = join_date.astimezone(MSK)
@@ -85,89 +150,277 @@ async def get_join_date(member: discord.Member):
     return "Неизвестно"
 
 async def get_event_count(user_id: str):
-    logging.info(f"Получение количества ивентов для {user_id}")
-    user_events_ref = db_ref.child("user_events").child(str(user_id))
-    user_events_count = await asyncio.to_thread(user_events_ref.child("total_events").get) or 0
+    log.info("Получение количества ивентов для %s", user_id)
+    user_events_count = await db_cache.get(f"user_events/{user_id}/total_events") or 0
     return user_events_count
 
 async def get_active_reprimands(user_id: str):
-    logging.info(f"Получение активных выговоров для {user_id}")
-    user_ref = db_ref.child("reprimands").child(str(user_id))
-    user_reprimands = await asyncio.to_thread(user_ref.child("reprimands").get) or {}
-    if isinstance(user_reprimands, list):
-        reprimands_dict = {str(i): r for i, r in enumerate(user_reprimands)}
-    else:
-        reprimands_dict = user_reprimands
-    active_reprimands = {idx: r for idx, r in reprimands_dict.items() if r.get("active", False)}
-    return active_reprimands
-
-def parse_time_to_minutes(time_str):
-    match = re.match(r'(\d+)\sч\.\s(\d+)\sм\.', time_str)
-    if match:
-        hours, minutes = map(int, match.groups())
-        return hours * 60 + minutes
-    return 0
-
-def format_minutes_to_hours(minutes):
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours} ч. {mins} м."
-
-def parse_stat_line(line):
-    parts = [part.strip() for part in line.split('|')]
-    if len(parts) != 4:
-        return None
-    name, static_id_part, time_str, value = parts
-    static_id_match = re.search(r'#(\d+)', static_id_part)
-    if not static_id_match:
-        return None
-    static_id = static_id_match.group(1)
-    reports = int(value) if value.isdigit() else 0
-    minutes = parse_time_to_minutes(time_str)
-    return {"name": name, "static_id": static_id, "minutes": minutes, "reports": reports}
+    log.info("Получение активных выговоров для %s", user_id)
+    reprimands = parse_reprimands(await db_cache.get(f"reprimands/{user_id}/reprimands"))
+    return [reprimand for reprimand in reprimands if reprimand.active]
+
+# Обратный индекс Discord ID -> static_id: узел admins_by_discord/{discord_id}/{static_id} = True
+# и его копия в памяти, чтобы не скачивать весь admins ради одного пользователя
+ADMIN_INDEX = {}
+admin_index_loaded = False
+
+@metrics.instrument("task:load_admin_index")
+@db_executor.background
+async def load_admin_index():
+    global admin_index_loaded
+    if admin_index_loaded:
+        return
+    admins_data = await db_cache.fetch("admins") or {}
+    index = {}
+    for static_id, admin_data in admins_data.items():
+        user_id = admin_data.get("user_id")
+        if user_id:
+            index.setdefault(str(user_id), {})[static_id] = True
+    await db_cache.set("admins_by_discord", index)
+    ADMIN_INDEX.clear()
+    ADMIN_INDEX.update(index)
+    admin_index_loaded = True
+    log.info("Индекс админов построен: %s пользователей", len(index))
+
+async def get_static_ids(discord_id: str):
+    discord_id = str(discord_id)
+    if discord_id not in ADMIN_INDEX:
+        static_ids = await db_cache.get(f"admins_by_discord/{discord_id}") or {}
+        if not static_ids and not admin_index_loaded:
+            # Индекс еще не построен — запрос по admins (.indexOn user_id), приходят только свои записи
+            static_ids = dict.fromkeys(await db_cache.query("admins", order_by="user_id", equal_to=discord_id), True)
+        if not static_ids:
+            return []
+        ADMIN_INDEX[discord_id] = static_ids
+    return sorted(ADMIN_INDEX[discord_id])
+
+async def save_admin(static_id: str, admin_data: dict):
+    # Запись админа и индекса одним multi-path update; старую привязку static_id снимаем
+    user_id = admin_data["user_id"]
+    old_user_id = await db_cache.get(f"admins/{static_id}/user_id")
+    updates = {
+        f"admins/{static_id}": admin_data,
+        f"admins_by_discord/{user_id}/{static_id}": True
+    }
+    if old_user_id and str(old_user_id) != user_id:
+        updates[f"admins_by_discord/{old_user_id}/{static_id}"] = None
+        ADMIN_INDEX.get(str(old_user_id), {}).pop(static_id, None)
+    await db_cache.update("", updates)
+    ADMIN_INDEX.setdefault(user_id, {})[static_id] = True
+
+async def find_admin_records(discord_id: str, name: str = None):
+    # Записи по Discord ID и, для киков, по совпадению никнейма или static_id с именем
+    # пользователя — запросами по индексам admins (.indexOn nickname), без выгрузки всего узла
+    records = {static_id: None for static_id in await get_static_ids(discord_id)}
+    if name:
+        by_nickname, by_static_id = await asyncio.gather(
+            db_cache.query("admins", order_by="nickname", equal_to=name),
+            db_cache.query("admins", order_by="$key", equal_to=name)
+        )
+        records.update(by_nickname)
+        records.update(by_static_id)
+    return records
+
+async def delete_admins(discord_id: str, name: str = None):
+    discord_id = str(discord_id)
+    records = await find_admin_records(discord_id, name)
+    if not records:
+        return []
+    updates = {}
+    for static_id, admin_data in records.items():
+        user_id = str((admin_data or {}).get("user_id", discord_id))
+        updates[f"admins/{static_id}"] = None
+        updates[f"admins_by_discord/{user_id}/{static_id}"] = None
+        ADMIN_INDEX.get(user_id, {}).pop(static_id, None)
+    await db_cache.update("", updates)
+    ADMIN_INDEX.pop(discord_id, None)
+    return sorted(records)
+
+# Статистика: user_stats/{static_id} — итоги и last_entry, user_stats_history/{static_id}/{push_id} —
+# записи импорта (только добавление), user_stats_daily/{static_id}/{YYYY-MM-DD} — суммы за день
+STATS_WINDOW_DAYS = 7
+
+def stats_day_key(date: datetime):
+    return date.strftime('%Y-%m-%d')
+
+def build_stats_updates(static_id: str, name: str, minutes: int, reports: int, now: datetime):
+    history_entry = StatsEntry(int(now.timestamp()), minutes, reports).to_db()
+    day_key = stats_day_key(now)
+    return {
+        f"user_stats/{static_id}/name": name,
+        f"user_stats/{static_id}/total_minutes": increment(minutes),
+        f"user_stats/{static_id}/total_reports": increment(reports),
+        f"user_stats/{static_id}/last_updated": history_entry["date"],
+        f"user_stats/{static_id}/last_entry": history_entry,
+        f"user_stats_history/{static_id}/{generate_push_key()}": history_entry,
+        f"user_stats_daily/{static_id}/{day_key}/minutes": increment(minutes),
+        f"user_stats_daily/{static_id}/{day_key}/reports": increment(reports)
+    }
+
+stats_migrations = set()
+
+async def migrate_stats_history(static_id: str, stats_data: dict):
+    # Перенос старого списка history из user_stats/{static_id} в отдельные записи и дневные суммы
+    if static_id in stats_migrations:
+        return
+    stats_migrations.add(static_id)
+    try:
+        history = stats_data.pop("history", None) or []
+        if isinstance(history, dict):
+            history = list(history.values())
+        updates = {f"user_stats/{static_id}/history": None}
+        daily = {}
+        history = [StatsEntry.from_db(entry).to_db() for entry in history if isinstance(entry, dict)]
+        for entry in history:
+            if entry["date"] is not None:
+                bucket = daily.setdefault(stats_day_key(to_datetime(entry["date"])), [0, 0])
+                bucket[0] += entry["added_minutes"]
+                bucket[1] += entry["added_reports"]
+            updates[f"user_stats_history/{static_id}/{generate_push_key()}"] = entry
+        for day_key, (minutes, reports) in daily.items():
+            updates[f"user_stats_daily/{static_id}/{day_key}/minutes"] = increment(minutes)
+            updates[f"user_stats_daily/{static_id}/{day_key}/reports"] = increment(reports)
+        if history and "last_entry" not in stats_data:
+            stats_data["last_entry"] = history[-1]
+            updates[f"user_stats/{static_id}/last_entry"] = history[-1]
+        await db_cache.update("", updates)
+        apply_leaderboard_daily(static_id, daily)
+        log.info("История статистики %s перенесена: %s записей", static_id, len(history))
+    finally:
+        stats_migrations.discard(static_id)
+
+# Рейтинги в памяти: строятся при старте, дальше обновляются импортом статистики
+leaderboard = Leaderboard()
+leaderboard_loading = asyncio.Lock()
+leaderboard_writes = 0  # Изменения статистики; если они были во время загрузки, рейтинг строится заново
+STATS_DAILY_PRUNE_CHUNK_SIZE = 500  # Путей в одном multi-path update
+
+def apply_leaderboard_daily(static_id: str, buckets: dict):
+    # buckets — {YYYY-MM-DD: (минуты, репорты)}, как в user_stats_daily
+    global leaderboard_writes
+    leaderboard_writes += 1
+    if leaderboard.loaded:
+        days = {date.fromisoformat(day_key): bucket for day_key, bucket in buckets.items()}
+        leaderboard.add_daily(static_id, days, datetime.now(MSK).date())
+
+@metrics.instrument("task:load_leaderboard")
+@db_executor.background
+async def load_leaderboard():
+    global leaderboard
+    stale = []
+    async with leaderboard_loading:
+        while not leaderboard.loaded:
+            writes = leaderboard_writes
+            user_stats, daily = await asyncio.gather(db_cache.fetch("user_stats"), db_cache.fetch("user_stats_daily"))
+            board = Leaderboard()
+            today = datetime.now(MSK).date()
+            oldest = window_start(today, MAX_WINDOW_DAYS)
+            stale.clear()
+            for static_id, stats_data in as_dict(user_stats).items():
+                stats = UserStats.from_db(static_id, stats_data or {})
+                board.set_totals(static_id, stats.name, stats.total_minutes, stats.total_reports)
+            for static_id, days in as_dict(daily).items():
+                buckets = {}
+                for day_key, bucket in as_dict(days).items():
+                    try:
+                        day = date.fromisoformat(day_key)
+                    except ValueError:
+                        continue
+                    if day < oldest:
+                        stale.append(f"user_stats_daily/{static_id}/{day_key}")
+                        continue
+                    buckets[day] = (bucket.get("minutes", 0), bucket.get("reports", 0))
+                board.add_daily(static_id, buckets, today)
+            board.loaded = writes == leaderboard_writes
+            leaderboard = board
+    log.info("Загружен рейтинг: %s пользователей", len(leaderboard.boards[('minutes', 'all')]))
+    # Рейтинг уже отвечает, удаление старых дней его не задерживает
+    await prune_stats_daily(stale)
+
+async def prune_stats_daily(paths: list):
+    # user_stats_daily нужен только окнам рейтинга и последних дней; дни старше самого
+    # длинного окна удаляем, чтобы чтение при старте не росло с историей. Сами записи
+    # остаются в user_stats_history, суммы по ним можно пересчитать
+    for start in range(0, len(paths), STATS_DAILY_PRUNE_CHUNK_SIZE):
+        await db_cache.update("", {path: None for path in paths[start:start + STATS_DAILY_PRUNE_CHUNK_SIZE]})
+    if paths:
+        log.info("Удалено %s дневных сумм старше %s дней", len(paths), MAX_WINDOW_DAYS)
 
 async def get_user_stats(discord_id: str):
-    admins_ref = db_ref.child("admins")
-    admins_data = await asyncio.to_thread(admins_ref.get) or {}
-    
-    for admin_id, admin_data in admins_data.items():
-        if admin_data.get("user_id") == discord_id:
-            static_id = admin_data.get("static_id")
-            if static_id:
-                stats_ref = db_ref.child("user_stats").child(static_id)
-                stats_data = await asyncio.to_thread(stats_ref.get) or {}
-                return static_id, stats_data
-    return None, {}
-
-async def check_active_events():
-    events = await asyncio.to_thread(EVENTS_REF.get) or {}
-    now = datetime.now(MSK)
-    for event_id, event_data in events.items():
-        if event_data.get("active", False):
-            event_time = datetime.fromisoformat(event_data["timestamp"]).astimezone(MSK)
-            if now >= event_time:
-                return True, event_id  # Есть активный ивент
-    return False, None
-
-async def check_scheduled_events():
-    events = await asyncio.to_thread(EVENTS_REF.get) or {}
+    static_ids = await get_static_ids(discord_id)
+    if not static_ids:
+        return None, None
+    static_id = static_ids[0]
+    stats_data = await db_cache.get(f"user_stats/{static_id}") or {}
+    if "history" in stats_data:
+        await migrate_stats_history(static_id, stats_data)
+    return static_id, UserStats.from_db(static_id, stats_data) if stats_data else None
+
+async def get_recent_stats(static_id: str, days: int = STATS_WINDOW_DAYS):
+    # Читаем не больше days дневных сумм, сколько бы ни было истории
+    since = stats_day_key(datetime.now(MSK) - timedelta(days=days - 1))
+    buckets = await db_cache.query(f"user_stats_daily/{static_id}", start_at=since)
+    recent_minutes = sum(bucket.get("minutes", 0) for bucket in buckets.values())
+    recent_reports = sum(bucket.get("reports", 0) for bucket in buckets.values())
+    return recent_minutes, recent_reports
+
+async def get_stats_summary(discord_id: str):
+    # Шаг плана /menu и /view_stats: окно за STATS_WINDOW_DAYS читается по static_id из user_stats
+    static_id, stats = await get_user_stats(discord_id)
+    if not stats:
+        return None
+    return stats, await get_recent_stats(static_id)
+
+def add_stats_fields(embed: discord.Embed, stats: UserStats, recent: tuple):
+    embed.add_field(
+        name="Общая статистика",
+        value=f"Часы: {format_minutes_to_hours(stats.total_minutes)}\nРепорты: {stats.total_reports}",
+        inline=False
+    )
+
+    recent_minutes, recent_reports = recent
+    embed.add_field(
+        name=f"За последние {STATS_WINDOW_DAYS} дней",
+        value=f"Часы: {format_minutes_to_hours(recent_minutes)}\nРепорты: {recent_reports}",
+        inline=False
+    )
+
+    last_entry = stats.last_entry
+    if last_entry:
+        embed.add_field(
+            name="Последнее обновление",
+            value=f"Дата: {format_timestamp(last_entry.date)}\nЧасы: {format_minutes_to_hours(last_entry.added_minutes)}\nРепорты: {last_entry.added_reports}",
+            inline=False
+        )
+
+# Состояние ивентов строится одним чтением events в load_events и дальше обновляется на месте
+event_state = EventState(timedelta(minutes=EVENT_COOLDOWN_MINUTES), EVENT_TRACKS)
+
+def event_creation_time(event: Event):
+    if event.created_at is not None:
+        return to_datetime(event.created_at)
+    # Ивенты до появления created_at: время зашито в push-ключ
+    created_ms = push_key_time(event.event_id)
+    if created_ms is not None:
+        return to_datetime(created_ms // 1000)
+    return to_datetime(event.timestamp)
+
+def booking_horizon(now: datetime):
+    # Конец последнего дня, доступного для записи
+    last_day = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=EVENT_BOOKING_DAYS)
+    return MSK.normalize(last_day) - timedelta(microseconds=1)
+
+async def next_event_slot(after: datetime = None):
+    # Ближайшее свободное время по расписанию в памяти: (datetime, дорожка) или None
+    if not event_state.loaded:
+        await load_events()
     now = datetime.now(MSK)
-    for event_id, event_data in events.items():
-        if event_data.get("active", False):  # Считаем только активные (не отмененные) ивенты
-            event_time = datetime.fromisoformat(event_data["timestamp"]).astimezone(MSK)
-            if now < event_time:  # Ивент еще не начался
-                return True, event_time  # Есть запланированный ивент, возвращаем его время
-    return False, None
-
-async def get_last_event_completion_time():
-    events = await asyncio.to_thread(EVENTS_REF.get) or {}
-    last_completion_time = None
-    for event_data in events.values():
-        if "completed_at" in event_data:
-            completed_at = datetime.fromisoformat(event_data["completed_at"]).astimezone(MSK)
-            if last_completion_time is None or completed_at > last_completion_time:
-                last_completion_time = completed_at
-    return last_completion_time
+    return event_state.next_free_slot(max(after or now, now), now, booking_horizon(now))
+
+def format_event_time(event_time: datetime):
+    if event_time.date() == datetime.now(MSK).date():
+        return event_time.strftime("%H:%M")
+    return event_time.strftime(DISPLAY_DATE_FORMAT)
 
 class WelcomeModalJoin(ui.Modal, title="Данные нового пользователя"):
     static_id = ui.TextInput(label="Статический ID", placeholder="Введите статический ID...", required=True)
@@ -180,6 +433,7 @@ class WelcomeModalJoin(ui.Modal, title="Данные нового пользов
         self.member_id = member_id
         self.date_joined = date_joined
 
+    @metrics.instrument("modal:WelcomeModalJoin")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             level = int(self.level.value)
@@ -189,17 +443,16 @@ class WelcomeModalJoin(ui.Modal, title="Данные нового пользов
             if entry_method not in ["Обзвон", "Восстановление"]:
                 raise ValueError("Способ вступления должен быть 'Обзвон' или 'Восстановление'!")
             
-            admin_data = {
-                "static_id": self.static_id.value,
-                "nickname": self.nickname.value,
-                "entry_method": entry_method,
-                "level": level,
-                "date_added": datetime.now(MSK).strftime('%H:%M %d:%m:%Y') + "Z",
-                "user_id": str(self.member_id),
-                "date_joined": self.date_joined
-            }
-            admin_ref = db_ref.child("admins").child(self.static_id.value)
-            await asyncio.to_thread(admin_ref.set, admin_data)
+            admin = Admin(
+                static_id=self.static_id.value,
+                user_id=str(self.member_id),
+                nickname=self.nickname.value,
+                entry_method=entry_method,
+                level=level,
+                date_added=now_timestamp(),
+                date_joined=parse_timestamp(self.date_joined)
+            )
+            await save_admin(admin.static_id, admin.to_db())
             
             channel = bot.get_channel(AUDIT_CHANNEL_ID)
             if channel:
@@ -211,14 +464,14 @@ class WelcomeModalJoin(ui.Modal, title="Данные нового пользов
                 embed.add_field(name="Discord ID", value=self.member_id, inline=False)
                 embed.add_field(name="Дата присоединения", value=self.date_joined, inline=False)
                 embed.set_footer(text=f"Заполнено: {interaction.user} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-                await channel.send(embed=embed)
+                outbox.send(channel, embed=embed)
                 await interaction.response.send_message("Данные успешно отправлены!", ephemeral=True)
             else:
                 await interaction.response.send_message("Ошибка: канал аудита не найден.", ephemeral=True)
         except ValueError as ve:
             await interaction.response.send_message(f"Ошибка валидации: {str(ve)}", ephemeral=True)
         except Exception as e:
-            logging.error(f"Ошибка при обработке данных: {e}")
+            log.error("Ошибка при обработке данных: %s", e)
             await interaction.response.send_message("Что-то пошло не так.", ephemeral=True)
 
 class WelcomeModalKick(ui.Modal, title="Данные после кика"):
@@ -232,23 +485,23 @@ class WelcomeModalKick(ui.Modal, title="Данные после кика"):
         self.member_id = member_id
         self.date_joined = date_joined
 
+    @metrics.instrument("modal:WelcomeModalKick")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             level = int(self.admin_level.value)
             if not 1 <= level <= 10:
                 raise ValueError("Уровень должен быть числом от 1 до 10!")
             
-            admin_data = {
-                "static_id": self.static_id.value,
-                "nickname": self.nickname.value,
-                "kick_reason": self.kick_reason.value,
-                "admin_level": level,
-                "date_added": datetime.now(MSK).strftime('%H:%M %d:%m:%Y') + "Z",
-                "user_id": str(self.member_id),
-                "date_joined": self.date_joined
-            }
-            admin_ref = db_ref.child("admins").child(self.static_id.value)
-            await asyncio.to_thread(admin_ref.set, admin_data)
+            admin = Admin(
+                static_id=self.static_id.value,
+                user_id=str(self.member_id),
+                nickname=self.nickname.value,
+                kick_reason=self.kick_reason.value,
+                admin_level=level,
+                date_added=now_timestamp(),
+                date_joined=parse_timestamp(self.date_joined)
+            )
+            await save_admin(admin.static_id, admin.to_db())
             
             channel = bot.get_channel(AUDIT_CHANNEL_ID)
             if channel:
@@ -260,23 +513,45 @@ class WelcomeModalKick(ui.Modal, title="Данные после кика"):
                 embed.add_field(name="Discord ID", value=self.member_id, inline=False)
                 embed.add_field(name="Дата присоединения", value=self.date_joined, inline=False)
                 embed.set_footer(text=f"Заполнено: {interaction.user} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-                await channel.send(embed=embed)
+                outbox.send(channel, embed=embed)
                 await interaction.response.send_message("Данные успешно отправлены!", ephemeral=True)
             else:
                 await interaction.response.send_message("Ошибка: канал аудита не найден.", ephemeral=True)
         except ValueError as ve:
             await interaction.response.send_message(f"Ошибка валидации: {str(ve)}", ephemeral=True)
         except Exception as e:
-            logging.error(f"Ошибка при обработке данных: {e}")
+            log.error("Ошибка при обработке данных: %s", e)
             await interaction.response.send_message("Что-то пошло не так.", ephemeral=True)
 
-class WelcomeButton(ui.Button):
+# Кнопки в сообщениях — DynamicItem: все состояние в custom_id (или в базе по id из него),
+# обработчики регистрируются один раз через bot.add_dynamic_items и переживают перезапуск
+def persistent_view(*items):
+    # Нажатия обрабатывает зарегистрированный DynamicItem, а не этот объект:
+    # останавливаем View до отправки, чтобы discord.py не держал его в памяти
+    view = ui.View(timeout=None)
+    for item in items:
+        view.add_item(item)
+    view.stop()
+    return view
+
+def disable_view(view: ui.View):
+    for child in view.children:
+        (child.item if isinstance(child, ui.DynamicItem) else child).disabled = True
+    view.stop()
+    return view
+
+class WelcomeButton(ui.DynamicItem[ui.Button], template=r"welcome_button_(?P<member_id>\d+)_(?P<kind>join|kick)_(?P<date>.*)"):
     def __init__(self, new_member_id: int, is_kick: bool = False, date_joined: str = None):
-        super().__init__(label="Заполнить данные", style=discord.ButtonStyle.primary, custom_id=f"welcome_button_{new_member_id}_{'kick' if is_kick else 'join'}_{date_joined or ''}")
+        super().__init__(ui.Button(label="Заполнить данные", style=discord.ButtonStyle.primary, custom_id=f"welcome_button_{new_member_id}_{'kick' if is_kick else 'join'}_{date_joined or ''}"))
         self.new_member_id = new_member_id
         self.is_kick = is_kick
         self.date_joined = date_joined
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(int(match["member_id"]), match["kind"] == "kick", match["date"] or None)
+
+    @metrics.instrument("button:WelcomeButton")
     async def callback(self, interaction: discord.Interaction):
         if interaction.user.id == self.new_member_id:
             await interaction.response.send_message("Вы не можете заполнять свои данные!", ephemeral=True)
@@ -289,11 +564,7 @@ class WelcomeButton(ui.Button):
         else:
             modal = WelcomeModalJoin(member_id=str(self.new_member_id), date_joined=self.date_joined or await get_join_date(interaction.guild.get_member(self.new_member_id)))
         await interaction.response.send_modal(modal)
-
-        self.disabled = True
-        for item in self.view.children:
-            item.disabled = True
-        await interaction.message.edit(view=self.view)
+        await interaction.message.edit(view=disable_view(self.view))
 
 class ReprimandModal(ui.Modal, title="Выдача выговора"):
     reprimand_type = ui.TextInput(label="Тип выговора", placeholder="Введите 'устный' или 'строгий'", required=True)
@@ -303,6 +574,7 @@ class ReprimandModal(ui.Modal, title="Выдача выговора"):
         super().__init__()
         self.member_id = member_id
 
+    @metrics.instrument("modal:ReprimandModal")
     async def on_submit(self, interaction: discord.Interaction):
         member = await bot.fetch_user(self.member_id) or interaction.guild.get_member(self.member_id)
         if not member:
@@ -317,48 +589,30 @@ class ReprimandModal(ui.Modal, title="Выдача выговора"):
             return
         now = datetime.now(MSK)
         expiration_days = 7 if reprimand_type == "устный" else 14
-        reprimand_type_value = "oral" if reprimand_type == "устный" else "strict"
         expiration_date = now + timedelta(days=expiration_days)
-        reprimand_data = {
-            "reason": self.reason.value,
-            "date": datetime.now(MSK).strftime('%H:%M %d:%m:%Y') + "Z",
-            "expiration_date": expiration_date.strftime('%H:%M %d:%m:%Y') + "Z",
-            "active": True,
-            "issuer_id": str(interaction.user.id),
-            "type": reprimand_type_value
-        }
-        user_ref = db_ref.child("reprimands").child(str(self.member_id))
-        user_reprimands = await asyncio.to_thread(user_ref.child("reprimands").get) or {}
-        if isinstance(user_reprimands, list):
-            user_reprimands = {str(i): r for i, r in enumerate(user_reprimands)}
-        reprimand_count = len(user_reprimands)
-        user_reprimands[str(reprimand_count)] = reprimand_data
-        active_oral_reprimands = [r for r in user_reprimands.values() if r["type"] == "oral" and r["active"]]
-        if reprimand_type == "устный" and len(active_oral_reprimands) >= 3:
-            oral_count = 0
-            for idx in list(user_reprimands.keys()):
-                if user_reprimands[idx]["type"] == "oral" and user_reprimands[idx]["active"]:
-                    del user_reprimands[idx]
-                    oral_count += 1
-                if oral_count == 3:
-                    break
-            reprimand_count = len(user_reprimands)
-            strict_reprimand = {
-                "reason": "Накопление 3 устных выговоров",
-                "date": datetime.now(MSK).strftime('%H:%M %d:%m:%Y') + "Z",
-                "expiration_date": (now + timedelta(days=14)).strftime('%H:%M %d:%m:%Y') + "Z",
-                "active": True,
-                "issuer_id": str(interaction.user.id),
-                "type": "strict"
-            }
-            user_reprimands[str(reprimand_count)] = strict_reprimand
+        reprimand = Reprimand(
+            key=generate_push_key(),
+            type="oral" if reprimand_type == "устный" else "strict",
+            reason=self.reason.value,
+            date=int(now.timestamp()),
+            expiration_date=int(expiration_date.timestamp()),
+            issuer_id=str(interaction.user.id)
+        )
+        # Одна запись под новым ключом и инкремент счетчика, без перезаписи списка
+        user_path = f"reprimands/{self.member_id}"
+        await db_cache.update(user_path, {
+            f"reprimands/{reprimand.key}": reprimand.to_db(),
+            reprimand_counter(reprimand.type): increment(1)
+        })
+        user_data = await db_cache.get(user_path) or {}
+        if reprimand.type == "oral" and (user_data.get("active_oral") or 0) >= 3:
+            promoted, user_data = await promote_oral_reprimands(self.member_id, str(interaction.user.id), now)
             channel = bot.get_channel(PUNISHMENTS_CHANNEL_ID)
-            if channel:
-                await channel.send(f"{member.mention} накопил 3 устных выговоров. Они заменены на 1 строгий выговор.")
-        reindexed_reprimands = {str(i): v for i, v in enumerate(user_reprimands.values())}
-        await asyncio.to_thread(user_ref.child("reprimands").set, reindexed_reprimands)
-        active_oral = sum(1 for r in user_reprimands.values() if r["type"] == "oral" and r["active"])
-        active_strict = sum(1 for r in user_reprimands.values() if r["type"] == "strict" and r["active"])
+            if promoted and channel:
+                outbox.send(channel, f"{member.mention} накопил 3 устных выговоров. Они заменены на 1 строгий выговор.")
+        schedule_reprimand_expiry(self.member_id, parse_reprimands(user_data.get("reprimands")))
+        active_oral = user_data.get("active_oral") or 0
+        active_strict = user_data.get("active_strict") or 0
         channel = bot.get_channel(PUNISHMENTS_CHANNEL_ID)
         if channel:
             embed = discord.Embed(title=f"Выдан {'Устный' if reprimand_type == 'устный' else 'Строгий'} выговор", color=discord.Color.red())
@@ -367,18 +621,53 @@ class ReprimandModal(ui.Modal, title="Выдача выговора"):
             embed.add_field(name="Истекает", value=expiration_date.strftime('%H:%M %d:%m:%Y'), inline=False)
             embed.add_field(name="Общее количество активных выговоров", value=f"Устные: {active_oral}\nСтрогие: {active_strict}", inline=False)
             embed.set_footer(text=f"Выдал: {interaction.user} | {now.strftime('%H:%M %d:%m:%Y')}")
-            await channel.send(embed=embed)
+            outbox.send(channel, embed=embed)
         try:
             await member.send(f"Вам выдан {'устный' if reprimand_type == 'устный' else 'строгий'} выговор за: {self.reason.value}. Истекает: {expiration_date.strftime('%H:%M %d:%m:%Y')}")
         except:
-            logging.warning(f"Не удалось отправить DM {member}")
+            log.warning("Не удалось отправить DM %s", member)
         await interaction.response.send_message(f"Выговор выдан {member.mention}!", ephemeral=True)
 
-class ReprimandButton(ui.Button):
+def reprimand_counter(reprimand_type: str):
+    return "active_oral" if reprimand_type == "oral" else "active_strict"
+
+async def promote_oral_reprimands(user_id, issuer_id: str, now: datetime):
+    # 3 активных устных -> 1 строгий. Транзакцией по узлу пользователя: при параллельной
+    # выдаче устные не заменятся дважды, а счетчики пересчитываются по самим записям
+    promoted = False
+
+    def update(user_data):
+        nonlocal promoted
+        user_data = user_data if isinstance(user_data, dict) else {}
+        reprimands = parse_reprimands(user_data.get("reprimands"))
+        orals = [r for r in reprimands if r.active and r.type == "oral"]
+        promoted = len(orals) >= 3
+        if promoted:
+            replaced = {r.key for r in orals[:3]}
+            reprimands = [r for r in reprimands if r.key not in replaced]
+            reprimands.append(Reprimand(
+                key=generate_push_key(),
+                type="strict",
+                reason="Накопление 3 устных выговоров",
+                date=int(now.timestamp()),
+                expiration_date=int((now + timedelta(days=14)).timestamp()),
+                issuer_id=issuer_id
+            ))
+        return {**user_data, "reprimands": reprimands_to_db(reprimands), **reprimand_counters(reprimands)}
+
+    user_data = await db_cache.transaction(f"reprimands/{user_id}", update)
+    return promoted, user_data or {}
+
+class ReprimandButton(ui.DynamicItem[ui.Button], template=r"open_reprimand_modal_(?P<member_id>\d+)"):
     def __init__(self, member_id: int):
-        super().__init__(label="Открыть", style=discord.ButtonStyle.primary, custom_id=f"open_reprimand_modal_{member_id}")
+        super().__init__(ui.Button(label="Открыть", style=discord.ButtonStyle.primary, custom_id=f"open_reprimand_modal_{member_id}"))
         self.member_id = member_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(int(match["member_id"]))
+
+    @metrics.instrument("button:ReprimandButton")
     async def callback(self, interaction: discord.Interaction):
         if not any(role.id in ADMIN_ROLES for role in interaction.user.roles):
             await interaction.response.send_message("У вас нет прав для выдачи выговоров!", ephemeral=True)
@@ -408,66 +697,83 @@ class MinuteSelect(ui.Select):
         self.view.minute = int(self.values[0])
         await interaction.response.defer()
 
-class CancelEventButton(ui.Button):
-    def __init__(self, event_id, creator_id, participants, creation_time):
-        super().__init__(label="Отменить мероприятие", style=discord.ButtonStyle.red, custom_id=f"cancel_event_{event_id}")
-        self.event_id = event_id
-        self.creator_id = creator_id
-        self.participants = participants
-        self.creation_time = creation_time
+class DaySelect(ui.Select):
+    def __init__(self):
+        today = datetime.now(MSK).date()
+        options = [
+            discord.SelectOption(label=(today + timedelta(days=offset)).strftime("%d.%m"), value=str(offset), default=offset == 0)
+            for offset in range(EVENT_BOOKING_DAYS)
+        ]
+        options[0].label += " (сегодня)"
+        super().__init__(placeholder="Выберите день", min_values=1, max_values=1, options=options, custom_id="day_select")
 
     async def callback(self, interaction: discord.Interaction):
-        current_time = datetime.now(MSK)
-        time_difference = (current_time - self.creation_time).total_seconds()
-        if time_difference > 24 * 3600:
-            await interaction.response.send_message("Срок отмены мероприятия истек (24 часа)!", ephemeral=True)
-            self.disabled = True
-            await interaction.message.edit(view=self.view)
-            return
+        self.view.day = int(self.values[0])
+        await interaction.response.defer()
 
-        if not (interaction.user.id in self.participants or any(role.id in ADMIN_ROLES for role in interaction.user.roles)):
-            await interaction.response.send_message("У вас нет прав для отмены этого мероприятия!", ephemeral=True)
-            return
+class CancelEventButton(ui.DynamicItem[ui.Button], template=r"cancel_event_(?P<event_id>[-\w]+)"):
+    def __init__(self, event_id: str):
+        super().__init__(ui.Button(label="Отменить мероприятие", style=discord.ButtonStyle.red, custom_id=f"cancel_event_{event_id}"))
+        self.event_id = event_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["event_id"])
+
+    @metrics.instrument("button:CancelEventButton")
+    async def callback(self, interaction: discord.Interaction):
         try:
-            event_ref = EVENTS_REF.child(self.event_id)
-            event_data = await asyncio.to_thread(event_ref.get)
+            # Создатель, участники и время создания — из узла мероприятия (events в зеркале)
+            event_data = await db_cache.get(f"events/{self.event_id}")
             if not event_data:
                 await interaction.response.send_message("Мероприятие уже было удалено!", ephemeral=True)
                 return
-            if not event_data.get("active", True):
+            event = Event.from_db(self.event_id, event_data)
+            if not event.active:
                 await interaction.response.send_message("Мероприятие уже было отменено ранее!", ephemeral=True)
                 return
+            creator_id = event.creator_id
+            participants = event.participants
+            creation_time = event_creation_time(event)
 
-            # Уменьшаем total_events для всех участников и создателя
-            all_users = [self.creator_id] + self.participants
-            for user_id in all_users:
-                user_events_ref = db_ref.child("user_events").child(str(user_id))
-                user_events_count = await asyncio.to_thread(user_events_ref.child("total_events").get) or 0
-                if user_events_count > 0:
-                    await asyncio.to_thread(user_events_ref.update, {"total_events": int(user_events_count) - 1})
-                    logging.info(f"Уменьшен total_events для пользователя {user_id} до {int(user_events_count) - 1}")
+            if (datetime.now(MSK) - creation_time).total_seconds() > 24 * 3600:
+                await interaction.response.send_message("Срок отмены мероприятия истек (24 часа)!", ephemeral=True)
+                await interaction.message.edit(view=disable_view(self.view))
+                return
+
+            if not (interaction.user.id in participants or any(role.id in ADMIN_ROLES for role in interaction.user.roles)):
+                await interaction.response.send_message("У вас нет прав для отмены этого мероприятия!", ephemeral=True)
+                return
 
-            # Удаляем мероприятие из базы данных
-            await asyncio.to_thread(event_ref.delete)
+            # Сначала удаляем мероприятие, затем уменьшаем total_events создателю и участникам
+            # транзакциями с нижней границей 0: increment(-count) мог увести счетчик в минус
+            await db_cache.delete(f"events/{self.event_id}")
+            # Из расписания и состояния — только после успешной записи, иначе ивент остался бы в базе без дедлайна
+            event_scheduler.cancel(self.event_id)
+            event_state.remove(self.event_id)
+            all_users = Counter(str(user_id) for user_id in [creator_id] + participants)
+            await asyncio.gather(*(
+                db_cache.transaction(f"user_events/{user_id}/total_events", lambda total, count=count: max(0, (total or 0) - count))
+                for user_id, count in all_users.items()
+            ))
+            log.info("Уменьшен total_events для пользователей %s", list(all_users))
 
             channel = bot.get_channel(EVENT_CHANNEL_ID)
             if channel:
                 embed = discord.Embed(title="Мероприятие отменено", color=discord.Color.red())
-                embed.add_field(name="Название", value=event_data["name"], inline=False)
-                embed.add_field(name="Время проведения", value=event_data["time"], inline=False)
-                embed.add_field(name="Участники", value=", ".join([f"<@{user_id}>" for user_id in self.participants]), inline=False)
+                embed.add_field(name="Название", value=event.name, inline=False)
+                embed.add_field(name="Время проведения", value=format_event_time(to_datetime(event.timestamp)) if event.timestamp else event.time, inline=False)
+                embed.add_field(name="Участники", value=", ".join([f"<@{user_id}>" for user_id in participants]), inline=False)
                 embed.set_footer(text=f"Отменил: {interaction.user} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-                await channel.send(embed=embed)
+                outbox.send(channel, embed=embed)
                 await interaction.response.send_message("Мероприятие успешно отменено!", ephemeral=True)
             else:
                 await interaction.response.send_message("Ошибка: канал ивентов не найден.", ephemeral=True)
 
-            logging.info(f"Мероприятие {self.event_id} отменено пользователем {interaction.user.id}")
-            self.disabled = True
-            await interaction.message.edit(view=self.view)
+            log.info("Мероприятие %s отменено пользователем %s", self.event_id, interaction.user.id)
+            await interaction.message.edit(view=disable_view(self.view))
         except Exception as e:
-            logging.error(f"Ошибка при отмене мероприятия {self.event_id}: {e}")
+            log.error("Ошибка при отмене мероприятия %s: %s", self.event_id, e)
             await interaction.response.send_message(f"Что-то пошло не так: {str(e)}", ephemeral=True)
 
 class TimeSelectView(ui.View):
@@ -476,8 +782,10 @@ class TimeSelectView(ui.View):
         self.event_name = event_name
         self.creator_id = creator_id
         self.participants = participants
+        self.day = 0  # Смещение в днях от сегодняшнего
         self.hour = None
         self.minute = None
+        self.add_item(DaySelect())
         self.add_item(HourSelect())
         self.add_item(MinuteSelect())
 
@@ -487,54 +795,71 @@ class TimeSelectView(ui.View):
         await self.message.edit(content="Время выбора истекло.", view=self)
 
     @ui.button(label="Подтвердить", style=discord.ButtonStyle.green)
+    @metrics.instrument("button:TimeSelectView.confirm")
     async def confirm(self, interaction: discord.Interaction, button: ui.Button):
         if self.hour is None or self.minute is None:
             await interaction.response.send_message("Пожалуйста, выберите час и минуты!", ephemeral=True)
             return
 
         try:
-            today = datetime.now(MSK).replace(hour=0, minute=0, second=0, microsecond=0)
-            event_time = today.replace(hour=self.hour, minute=self.minute)
-
             current_time = datetime.now(MSK)
-            time_difference = (event_time - current_time).total_seconds()
-            if time_difference < 0:
+            day = (current_time + timedelta(days=self.day)).date()
+            event_time = MSK.localize(datetime(day.year, day.month, day.day, self.hour, self.minute))
+
+            if event_time < current_time:
                 await interaction.response.send_message("Нельзя создать мероприятие в прошлом!", ephemeral=True)
                 return
 
-            all_users = [self.creator_id] + self.participants
-            for user_id in all_users:
-                user_events_ref = db_ref.child("user_events").child(str(user_id))
-                user_events_count = await asyncio.to_thread(user_events_ref.child("total_events").get) or 0
-                await asyncio.to_thread(user_events_ref.update, {"total_events": int(user_events_count) + 1})
-
-            event_data = {
-                "name": self.event_name,
-                "time": event_time.strftime("%H:%M"),
-                "timestamp": event_time.isoformat(),
-                "creator_id": self.creator_id,
-                "participants": self.participants,
-                "active": True
-            }
-            event_ref = EVENTS_REF.push()
-            await asyncio.to_thread(event_ref.set, event_data)
-            event_id = event_ref.key
-            creation_time = datetime.now(MSK)
+            # Проверка по расписанию в памяти, без чтения events
+            if not event_state.loaded:
+                await load_events()
+            track = event_state.free_track(event_time, current_time)
+            if track is None:
+                conflict = event_state.conflict(event_time)
+                reason = (
+                    f"пересекается с мероприятием в {format_event_time(conflict[0])}" if conflict
+                    else f"после прошлого мероприятия должно пройти {EVENT_COOLDOWN_MINUTES} минут"
+                )
+                slot = await next_event_slot(event_time)
+                suggestion = f" Ближайшее свободное время: {format_event_time(slot[0])}." if slot else ""
+                await interaction.response.send_message(f"Это время занято: {reason}.{suggestion}", ephemeral=True)
+                return
+
+            # Слот занимаем до записи в базу, чтобы параллельное подтверждение его не получило
+            event_id = generate_push_key()
+            event_state.add(event_id, event_time, track)
+            event = Event(
+                event_id=event_id,
+                name=self.event_name,
+                time=event_time.strftime("%H:%M"),
+                timestamp=int(event_time.timestamp()),
+                creator_id=self.creator_id,
+                participants=self.participants,
+                created_at=now_timestamp(),
+                track=track
+            )
+            # Мероприятие и счетчики всех участников пишем одним атомарным multi-path update
+            all_users = Counter(str(user_id) for user_id in [self.creator_id] + self.participants)
+            try:
+                creator_events = (await db_cache.get(f"user_events/{self.creator_id}/total_events") or 0) + all_users[str(self.creator_id)]
+                updates = {f"user_events/{user_id}/total_events": increment(count) for user_id, count in all_users.items()}
+                updates[f"events/{event_id}"] = event.to_db()
+                await db_cache.update("", updates)
+            except Exception:
+                event_state.remove(event_id)
+                raise
+            event_scheduler.schedule(event_id, event_time)
 
             channel = bot.get_channel(EVENT_CHANNEL_ID)
             if channel:
-                creator_events = await asyncio.to_thread(db_ref.child("user_events").child(str(self.creator_id)).child("total_events").get) or 0
                 embed = discord.Embed(title="Новое мероприятие", color=discord.Color.blue())
                 embed.add_field(name="Название", value=self.event_name, inline=False)
-                embed.add_field(name="Время проведения", value=event_time.strftime("%H:%M"), inline=False)
+                embed.add_field(name="Время проведения", value=format_event_time(event_time), inline=False)
                 embed.add_field(name="Участники", value=", ".join([f"<@{user_id}>" for user_id in self.participants]), inline=False)
                 embed.add_field(name="Всего ивентов создателя", value=str(creator_events), inline=False)
                 embed.set_footer(text=f"Создано: {interaction.user} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
                 
-                cancel_view = ui.View(timeout=24 * 3600)
-                cancel_view.add_item(CancelEventButton(event_id=event_id, creator_id=self.creator_id, participants=self.participants, creation_time=creation_time))
-                
-                await channel.send(embed=embed, view=cancel_view)
+                outbox.send(channel, embed=embed, view=persistent_view(CancelEventButton(event_id)))
                 await interaction.response.send_message("Мероприятие успешно создано!", ephemeral=True)
             else:
                 await interaction.response.send_message("Ошибка: канал ивентов не найден.", ephemeral=True)
@@ -543,7 +868,7 @@ class TimeSelectView(ui.View):
                 item.disabled = True
             await self.message.edit(view=self)
         except Exception as e:
-            logging.error(f"Ошибка при создании мероприятия: {e}")
+            log.error("Ошибка при создании мероприятия: %s", e)
             await interaction.response.send_message(f"Что-то пошло не так: {str(e)}", ephemeral=True)
 
 class EventModal(ui.Modal, title="Создание мероприятия"):
@@ -553,6 +878,7 @@ class EventModal(ui.Modal, title="Создание мероприятия"):
         super().__init__()
         self.participants = participants
 
+    @metrics.instrument("modal:EventModal")
     async def on_submit(self, interaction: discord.Interaction):
         try:
             creator_id = str(interaction.user.id)
@@ -560,7 +886,7 @@ class EventModal(ui.Modal, title="Создание мероприятия"):
             await interaction.response.send_message("Выберите время мероприятия:", view=view, ephemeral=True)
             view.message = await interaction.original_response()
         except Exception as e:
-            logging.error(f"Ошибка при открытии выбора времени: {e}")
+            log.error("Ошибка при открытии выбора времени: %s", e)
             await interaction.response.send_message(f"Что-то пошло не так: {str(e)}", ephemeral=True)
 
 class EventButton(ui.Button):
@@ -568,6 +894,7 @@ class EventButton(ui.Button):
         super().__init__(label="Заполнить данные", style=discord.ButtonStyle.primary, custom_id="open_event_modal")
         self.participants = participants
 
+    @metrics.instrument("button:EventButton")
     async def callback(self, interaction: discord.Interaction):
         modal = EventModal(self.participants)
         await interaction.response.send_modal(modal)
@@ -576,204 +903,289 @@ class EventButton(ui.Button):
         except:
             pass
 
+FETCH_FAILED_TEXT = "Не удалось загрузить данные, попробуйте позже."
+
 @app_commands.command(name="menu", description="Посмотреть свои выговоры, ивенты, дату присоединения и статистику")
+@metrics.instrument("/menu")
 async def menu(interaction: discord.Interaction):
     try:
-        logging.info(f"Команда /menu вызвана пользователем {interaction.user.id} в канале {interaction.channel_id}")
+        log.info("Команда /menu вызвана пользователем %s в канале %s", interaction.user.id, interaction.channel_id)
         user = interaction.user
         user_id = str(user.id)
 
         join_date = await get_join_date(user)
-        event_count = await get_event_count(user_id)
-        active_reprimands = await get_active_reprimands(user_id)
-        static_id, stats_data = await get_user_stats(user_id)
+        data = await (
+            FetchPlan("/menu")
+            .add("events", get_event_count(user_id))
+            .add("reprimands", get_active_reprimands(user_id))
+            .add("stats", get_stats_summary(user_id))
+            .run(interaction)
+        )
+        active_reprimands = data.get("reprimands")
+        summary = data.get("stats")
 
         embed = discord.Embed(title=f"Информация о {user.display_name}", color=discord.Color.blue())
         embed.add_field(name="Дата присоединения", value=join_date, inline=False)
-        embed.add_field(name="Проведено ивентов", value=str(event_count), inline=False)
+        embed.add_field(name="Проведено ивентов", value=FETCH_FAILED_TEXT if "events" in data.missing else str(data.get("events")), inline=False)
 
-        if active_reprimands:
+        if "reprimands" in data.missing:
+            embed.add_field(name="Активные выговоры", value=FETCH_FAILED_TEXT, inline=False)
+        elif active_reprimands:
             reprimands_text = ""
-            for idx, r in active_reprimands.items():
-                reprimand_type = "Устный" if r.get("type") == "oral" else "Строгий"
-                issuer = bot.get_user(int(r.get("issuer_id", "0"))) or "Неизвестен"
-                reprimands_text += f"**Выговор {int(idx) + 1} ({reprimand_type})**\nПричина: {r.get('reason')}\nДата: {r.get('date')}\nИстекает: {r.get('expiration_date')}\nВыдал: {issuer}\n\n"
+            for number, reprimand in enumerate(active_reprimands, 1):
+                issuer = bot.get_user(int(reprimand.issuer_id)) or "Неизвестен"
+                reprimands_text += (
+                    f"**Выговор {number} ({reprimand.type_label})**\nПричина: {reprimand.reason}\n"
+                    f"Дата: {format_timestamp(reprimand.date)}\nИстекает: {format_timestamp(reprimand.expiration_date)}\nВыдал: {issuer}\n\n"
+                )
             embed.add_field(name="Активные выговоры", value=reprimands_text, inline=False)
         else:
             embed.add_field(name="Активные выговоры", value="Нет активных выговоров", inline=False)
 
-        if static_id and stats_data:
-            total_minutes = stats_data.get("total_minutes", 0)
-            total_reports = stats_data.get("total_reports", 0)
-            embed.add_field(
-                name="Общая статистика",
-                value=f"Часы: {format_minutes_to_hours(total_minutes)}\nРепорты: {total_reports}",
-                inline=False
-            )
-
-            seven_days_ago = datetime.now(MSK) - timedelta(days=7)
-            recent_minutes = 0
-            recent_reports = 0
-            history = stats_data.get("history", [])
-            for entry in history:
-                entry_date = datetime.strptime(
-                    entry["date"].replace("Z", ""), '%H:%M %d:%m:%Y'
-                ).replace(tzinfo=MSK)
-                if entry_date >= seven_days_ago:
-                    recent_minutes += entry.get("added_minutes", 0)
-                    recent_reports += entry.get("added_reports", 0)
-            embed.add_field(
-                name="За последние 7 дней",
-                value=f"Часы: {format_minutes_to_hours(recent_minutes)}\nРепорты: {recent_reports}",
-                inline=False
-            )
-
-            if history:
-                last_entry = history[-1]
-                embed.add_field(
-                    name="Последнее обновление",
-                    value=f"Дата: {last_entry['date']}\nЧасы: {format_minutes_to_hours(last_entry['added_minutes'])}\nРепорты: {last_entry['added_reports']}",
-                    inline=False
-                )
+        if "stats" in data.missing:
+            embed.add_field(name="Статистика", value=FETCH_FAILED_TEXT, inline=False)
+        elif summary:
+            add_stats_fields(embed, *summary)
         else:
             embed.add_field(name="Статистика", value="Нет данных о статистике (привяжите static_id через /link_stats).", inline=False)
 
         embed.set_footer(text=f"Запросил: {user.display_name} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        logging.info(f"Пользователь {user_id} успешно получил информацию через /menu")
+        await respond(interaction, embed=embed, ephemeral=True)
+        log.info("Пользователь %s успешно получил информацию через /menu", user_id)
     except Exception as e:
-        logging.error(f"Ошибка в команде /menu: {e}")
-        await interaction.response.send_message("Произошла ошибка при выполнении команды.", ephemeral=True)
+        log.error("Ошибка в команде /menu: %s", e)
+        await respond(interaction, "Произошла ошибка при выполнении команды.", ephemeral=True)
+
+IMPORT_PREFETCH_CONCURRENCY = 10  # Одновременных чтений user_stats при импорте
+
+@db_executor.background
+async def import_stat_records(records: list, now: datetime):
+    # Строки одного static_id складываем, текущие итоги читаем параллельно,
+    # а все изменения отправляем одним multi-path update
+    merged = {}
+    for stat_data in records:
+        record = merged.setdefault(stat_data["static_id"], {"name": stat_data["name"], "minutes": 0, "reports": 0})
+        record["name"] = stat_data["name"]
+        record["minutes"] += stat_data["minutes"]
+        record["reports"] += stat_data["reports"]
+
+    semaphore = asyncio.Semaphore(IMPORT_PREFETCH_CONCURRENCY)
+
+    async def prefetch(static_id):
+        async with semaphore:
+            existing_data = await db_cache.get(f"user_stats/{static_id}") or {}
+        if "history" in existing_data:
+            await migrate_stats_history(static_id, existing_data)
+        return static_id, existing_data
+
+    existing = dict(await asyncio.gather(*(prefetch(static_id) for static_id in merged)))
+
+    updates = {}
+    totals = {}
+    for static_id, record in merged.items():
+        updates.update(build_stats_updates(static_id, record["name"], record["minutes"], record["reports"], now))
+        totals[static_id] = (
+            existing[static_id].get("total_minutes", 0) + record["minutes"],
+            existing[static_id].get("total_reports", 0) + record["reports"]
+        )
+    if updates:
+        await db_cache.update("", updates)
+    day_key = stats_day_key(now)
+    for static_id, record in merged.items():
+        leaderboard.set_totals(static_id, record["name"], *totals[static_id])
+        apply_leaderboard_daily(static_id, {day_key: (record["minutes"], record["reports"])})
+    return totals
+
+async def send_import_report(interaction: discord.Interaction, summary: str, report_lines: list):
+    report = "\n".join(report_lines)
+    if len(summary) + len(report) + 10 <= 2000:
+        await interaction.followup.send(f"{summary}\n```\n{report}\n```" if report else summary, ephemeral=True)
+    else:
+        report_file = discord.File(io.BytesIO(report.encode("utf-8")), filename="import_report.txt")
+        await interaction.followup.send(summary, file=report_file, ephemeral=True)
+
+IMPORT_CHUNK_SIZE = 200  # Записей в одном multi-path update при импорте
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+http_session = None
+
+async def get_http_session():
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession()
+    return http_session
+
+async def iter_text_lines(stats_text: str):
+    for line in STATS_SPLIT_RE.split(stats_text):
+        yield line
+
+async def iter_attachment_lines(attachment: discord.Attachment):
+    # Файл читается потоком по строкам, целиком в памяти не держится
+    session = await get_http_session()
+    async with session.get(attachment.url) as response:
+        response.raise_for_status()
+        first = True
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8", errors="replace")
+            if first:
+                line = line.lstrip("\ufeff")
+                first = False
+            yield line
+
+async def run_stats_import(lines, parse=parse_stat_line):
+    # Разбор строк и запись пачками по IMPORT_CHUNK_SIZE: (записей, static_id, строки отчета, мс разбора, мс базы)
+    now = datetime.now(MSK)
+    report_lines = []
+    updated_ids = {}
+    updated_users = 0
+    parse_time = 0.0
+    db_time = 0.0
+    chunk = []
+
+    async def flush():
+        nonlocal db_time
+        started = time.perf_counter()
+        totals = await import_stat_records([stat_data for _, stat_data in chunk], now)
+        db_time += time.perf_counter() - started
+        for line_number, stat_data in chunk:
+            total_minutes, total_reports = totals[stat_data["static_id"]]
+            report_lines.append((line_number,
+                f"✔ {line_number}: {stat_data['name']} #{stat_data['static_id']} "
+                f"+{format_minutes_to_hours(stat_data['minutes'])}, +{stat_data['reports']} реп. "
+                f"→ {format_minutes_to_hours(total_minutes)}, {total_reports} реп."
+            ))
+            updated_ids[stat_data["static_id"]] = True
+        chunk.clear()
+
+    line_number = 0
+    async for line in lines:
+        started = time.perf_counter()
+        line = line.strip()
+        if not line:
+            continue
+        line_number += 1
+        stat_data = parse(line)
+        parse_time += time.perf_counter() - started
+        if not stat_data:
+            log.warning("Некорректная строка статистики: %s", line[:100])
+            report_lines.append((line_number, f"✘ {line_number}: некорректная строка «{line[:50]}»"))
+            continue
+        chunk.append((line_number, stat_data))
+        updated_users += 1
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+
+    report_lines = [report_line for _, report_line in sorted(report_lines)]
+    return updated_users, list(updated_ids), report_lines, parse_time * 1000, db_time * 1000
 
 @app_commands.command(name="import_stats", description="Импортировать статистику с другого сервера")
 @app_commands.checks.has_any_role(*ADMIN_ROLES)
-async def import_stats(interaction: discord.Interaction, stats_text: str):
+@app_commands.describe(stats_text="Строки статистики", file="Файл со статистикой (CSV или TXT, по строке на запись)")
+@metrics.instrument("/import_stats")
+async def import_stats(interaction: discord.Interaction, stats_text: str = None, file: discord.Attachment = None):
     try:
-        logging.info(f"Команда /import_stats вызвана пользователем {interaction.user.id} с текстом: {stats_text}")
-        lines = re.split(r'(?=\b[A-Za-z]+\s*\|)', stats_text)
-        updated_users = 0
-        updated_ids = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            stat_data = parse_stat_line(line)
-            if not stat_data:
-                logging.warning(f"Некорректная строка статистики: {line}")
-                continue
-
-            user_id = stat_data["static_id"]
-            user_ref = db_ref.child("user_stats").child(user_id)
-            existing_data = await asyncio.to_thread(user_ref.get) or {}
-
-            history_entry = {
-                "date": datetime.now(MSK).strftime('%H:%M %d:%m:%Y'),
-                "added_minutes": stat_data["minutes"],
-                "added_reports": stat_data["reports"]
-            }
-
-            new_data = {
-                "name": stat_data["name"],
-                "total_minutes": existing_data.get("total_minutes", 0) + stat_data["minutes"],
-                "total_reports": existing_data.get("total_reports", 0) + stat_data["reports"],
-                "last_updated": datetime.now(MSK).strftime('%H:%M %d:%m:%Y'),
-                "history": existing_data.get("history", []) + [history_entry]
-            }
-            await asyncio.to_thread(user_ref.set, new_data)
-            updated_users += 1
-            updated_ids.append(user_id)
-            logging.info(f"Обновлена статистика для статического ID {user_id}: {new_data}")
+        log.info("Команда /import_stats вызвана пользователем %s, длина текста: %s, файл: %s", interaction.user.id, len(stats_text or ''), file.filename if file else None)
+        if not stats_text and not file:
+            await interaction.response.send_message("Передайте строки статистики или файл CSV/TXT.", ephemeral=True)
+            return
+        if file and (not file.filename.lower().endswith((".csv", ".txt")) or file.size > IMPORT_MAX_FILE_SIZE):
+            await interaction.response.send_message(f"Поддерживаются файлы .csv и .txt размером до {IMPORT_MAX_FILE_SIZE // (1024 * 1024)} МБ.", ephemeral=True)
+            return
+        # Импорт может идти дольше 3 секунд, отвечаем Discord сразу
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        started = time.perf_counter()
+        lines = iter_attachment_lines(file) if file else iter_text_lines(stats_text)
+        parse = csv_stat_parser() if file and file.filename.lower().endswith(".csv") else parse_stat_line
+        updated_users, updated_ids, report_lines, parse_ms, db_ms = await run_stats_import(lines, parse)
+        total_ms = (time.perf_counter() - started) * 1000
 
         notification_channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
         if notification_channel:
             embed = discord.Embed(
                 title="Статистика обновлена",
-                description=f"Пользователь {interaction.user.mention} импортировал статистику.\nОбновлено записей: {updated_users}\nОбновленные ID: {', '.join(updated_ids)}",
+                description=f"Пользователь {interaction.user.mention} импортировал статистику.\nОбновлено записей: {updated_users}\nОбновленные ID: {', '.join(updated_ids)}"[:4096],
                 color=discord.Color.green()
             )
             embed.set_footer(text=f"Время: {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-            await notification_channel.send(embed=embed)
-            logging.info(f"Уведомление отправлено в канал {NOTIFICATION_CHANNEL_ID}")
+            outbox.send(notification_channel, embed=embed)
+            log.info("Уведомление поставлено в очередь канала %s", NOTIFICATION_CHANNEL_ID)
         else:
-            logging.warning(f"Канал с ID {NOTIFICATION_CHANNEL_ID} не найден")
+            log.warning("Канал с ID %s не найден", NOTIFICATION_CHANNEL_ID)
 
-        await interaction.response.send_message(f"Импортировано и обновлено {updated_users} записей.", ephemeral=True)
-        logging.info(f"Успешно импортировано {updated_users} записей для пользователя {interaction.user.id}")
+        summary = (
+            f"Импортировано и обновлено {updated_users} записей.\n"
+            f"Разбор: {parse_ms:.0f} мс, чтение и запись в базу: {db_ms:.0f} мс, всего: {total_ms:.0f} мс"
+        )
+        await send_import_report(interaction, summary, report_lines)
+        log.info("Успешно импортировано %s записей для пользователя %s за %.0f мс", updated_users, interaction.user.id, total_ms)
     except Exception as e:
-        logging.error(f"Ошибка в команде /import_stats: {e}")
-        await interaction.response.send_message("Произошла ошибка при импорте статистики.", ephemeral=True)
+        log.error("Ошибка в команде /import_stats: %s", e)
+        if interaction.response.is_done():
+            await interaction.followup.send("Произошла ошибка при импорте статистики.", ephemeral=True)
+        else:
+            await interaction.response.send_message("Произошла ошибка при импорте статистики.", ephemeral=True)
 
 @app_commands.command(name="link_stats", description="Привязать статический ID к вашему Discord ID")
+@metrics.instrument("/link_stats")
 async def link_stats(interaction: discord.Interaction, static_id: str):
     try:
-        logging.info(f"Команда /link_stats вызвана пользователем {interaction.user.id} с static_id: {static_id}")
+        log.info("Команда /link_stats вызвана пользователем %s с static_id: %s", interaction.user.id, static_id)
         user_id = str(interaction.user.id)
-        admins_ref = db_ref.child("admins")
-        admins_data = await asyncio.to_thread(admins_ref.get) or {}
-        
-        found = False
-        for admin_id, admin_data in admins_data.items():
-            if admin_data.get("user_id") == user_id and admin_data.get("static_id") == static_id:
-                found = True
-                break
-        
-        if not found:
+        if static_id not in await get_static_ids(user_id):
             await interaction.response.send_message(f"Статический ID {static_id} не соответствует вашему аккаунту.", ephemeral=True)
-            logging.warning(f"Пользователь {user_id} пытался привязать неподходящий static_id: {static_id}")
+            log.warning("Пользователь %s пытался привязать неподходящий static_id: %s", user_id, static_id)
             return
 
-        stats_ref = db_ref.child("user_stats").child(static_id)
-        stats_data = await asyncio.to_thread(stats_ref.get) or {}
-        stats_data["discord_id"] = user_id
-        await asyncio.to_thread(stats_ref.set, stats_data)
+        await db_cache.update(f"user_stats/{static_id}", {"discord_id": user_id})
         await interaction.response.send_message(f"Статический ID {static_id} успешно привязан к вашему аккаунту.", ephemeral=True)
-        logging.info(f"Пользователь {user_id} привязал статический ID {static_id}")
+        log.info("Пользователь %s привязал статический ID %s", user_id, static_id)
     except Exception as e:
-        logging.error(f"Ошибка в команде /link_stats: {e}")
+        log.error("Ошибка в команде /link_stats: %s", e)
         await interaction.response.send_message("Произошла ошибка при привязке.", ephemeral=True)
 
 @bot.command(name="audit")
+@metrics.instrument("!audit")
 async def audit(ctx, member: discord.Member):
-    logging.info(f"Команда !audit вызвана пользователем {ctx.author.id} для пользователя {member.id}")
+    log.info("Команда !audit вызвана пользователем %s для пользователя %s", ctx.author.id, member.id)
     if ctx.guild.id != GUILD_ID:
-        logging.warning(f"Команда !audit вызвана не на основном сервере (GUILD_ID: {GUILD_ID})")
+        log.warning("Команда !audit вызвана не на основном сервере (GUILD_ID: %s)", GUILD_ID)
         await ctx.send("Эта команда доступна только на основном сервере!", delete_after=5)
         return
     if not any(role.id in ALLKICK_ROLES for role in ctx.author.roles):
-        logging.warning(f"Пользователь {ctx.author.id} не имеет прав для команды !audit (отсутствуют роли из ALLKICK_ROLES)")
+        log.warning("Пользователь %s не имеет прав для команды !audit (отсутствуют роли из ALLKICK_ROLES)", ctx.author.id)
         await ctx.send("У вас нет прав для использования этой команды!", delete_after=5)
         return
 
     channel = bot.get_channel(WELCOME_CHANNEL_ID)
     if channel:
         join_date = await get_join_date(member)
-        view = ui.View()
-        view.add_item(WelcomeButton(new_member_id=member.id, is_kick=False, date_joined=join_date))
+        view = persistent_view(WelcomeButton(new_member_id=member.id, is_kick=False, date_joined=join_date))
         try:
             await channel.send(
                 f"Пользователю {member.mention} необходимо заполнить Audit.",
                 view=view
             )
-            logging.info(f"Сообщение об аудите для {member.id} успешно отправлено в канал {WELCOME_CHANNEL_ID}")
+            log.info("Сообщение об аудите для %s успешно отправлено в канал %s", member.id, WELCOME_CHANNEL_ID)
             await ctx.send(f"Аудит для {member.mention} инициирован в канале {channel.mention}.", ephemeral=True)
         except discord.errors.Forbidden:
-            logging.error(f"Не удалось отправить сообщение в канал {WELCOME_CHANNEL_ID}: недостаточно прав.")
+            log.error("Не удалось отправить сообщение в канал %s: недостаточно прав.", WELCOME_CHANNEL_ID)
             await ctx.send("Ошибка: нет прав для отправки сообщения в канал аудита.", ephemeral=True)
         except discord.errors.HTTPException as e:
-            logging.error(f"Не удалось отправить сообщение в канал {WELCOME_CHANNEL_ID}: {str(e)}")
+            log.error("Не удалось отправить сообщение в канал %s: %s", WELCOME_CHANNEL_ID, str(e))
             await ctx.send(f"Ошибка: {str(e)}", ephemeral=True)
     else:
-        logging.error(f"Канал с ID {WELCOME_CHANNEL_ID} не найден")
+        log.error("Канал с ID %s не найден", WELCOME_CHANNEL_ID)
         await ctx.send("Ошибка: канал аудита не найден.", ephemeral=True)
 
     try:
         await ctx.message.delete()
     except:
-        logging.warning(f"Не удалось удалить сообщение {ctx.message.id} от {ctx.author.id}")
+        log.warning("Не удалось удалить сообщение %s от %s", ctx.message.id, ctx.author.id)
 
 @bot.command(name="warn")
+@metrics.instrument("!warn")
 async def issue_reprimand(ctx):
     if ctx.guild.id != GUILD_ID or ctx.channel.id != PUNISHMENTS_CHANNEL_ID:
         return
@@ -783,8 +1195,7 @@ async def issue_reprimand(ctx):
     if not any(role.id in ADMIN_ROLES for role in ctx.author.roles):
         await ctx.send("У вас нет прав для выдачи выговоров!", delete_after=5)
         return
-    view = ui.View()
-    view.add_item(ReprimandButton(member_id=ctx.message.mentions[0].id))
+    view = persistent_view(ReprimandButton(member_id=ctx.message.mentions[0].id))
     await ctx.send("Нажмите кнопку ниже для выдачи выговора:", view=view, ephemeral=True)
     try:
         await ctx.message.delete()
@@ -792,48 +1203,40 @@ async def issue_reprimand(ctx):
         pass
 
 @bot.command(name="delete_warn")
+@metrics.instrument("!delete_warn")
 async def remove_reprimand(ctx, member: discord.Member, reprimand_type: str = None):
     if ctx.guild.id != GUILD_ID or ctx.channel.id != PUNISHMENTS_CHANNEL_ID:
         return
     if not any(role.id in ADMIN_ROLES for role in ctx.author.roles):
         await ctx.send("У вас нет прав для снятия выговоров!", delete_after=5)
         return
-    user_ref = db_ref.child("reprimands").child(str(member.id))
-    user_reprimands = await asyncio.to_thread(user_ref.child("reprimands").get) or {}
-    if isinstance(user_reprimands, list):
-        user_reprimands = {str(i): r for i, r in enumerate(user_reprimands)}
-    if not user_reprimands or not any(r["active"] for r in user_reprimands.values()):
+    user_path = f"reprimands/{member.id}"
+    reprimands = parse_reprimands(await db_cache.get(f"{user_path}/reprimands"))
+    if not any(r.active for r in reprimands):
         await ctx.send("У пользователя нет активных выговоров!", ephemeral=True)
         return
-    
+
     reprimand_to_remove = None
     if reprimand_type and reprimand_type.lower() in ["устный", "строгий"]:
-        for idx in reversed(list(user_reprimands.keys())):
-            if user_reprimands[idx]["active"] and user_reprimands[idx]["type"] == ("oral" if reprimand_type.lower() == "устный" else "strict"):
-                reprimand_to_remove = idx
-                break
+        wanted_type = "oral" if reprimand_type.lower() == "устный" else "strict"
+        reprimand_to_remove = next((r for r in reversed(reprimands) if r.active and r.type == wanted_type), None)
     else:
-        for idx in list(user_reprimands.keys()):
-            if user_reprimands[idx]["active"] and user_reprimands[idx]["type"] == "oral":
-                reprimand_to_remove = idx
-                break
-        if not reprimand_to_remove:
-            for idx in reversed(list(user_reprimands.keys())):
-                if user_reprimands[idx]["active"]:
-                    reprimand_to_remove = idx
-                    break
+        reprimand_to_remove = next((r for r in reprimands if r.active and r.type == "oral"), None)
+        if reprimand_to_remove is None:
+            reprimand_to_remove = next((r for r in reversed(reprimands) if r.active), None)
 
     if reprimand_to_remove is not None:
-        removed_type = "устный" if user_reprimands[reprimand_to_remove]["type"] == "oral" else "строгий"
-        del user_reprimands[reprimand_to_remove]
-        reindexed_reprimands = {str(i): v for i, v in enumerate(user_reprimands.values())}
-        await asyncio.to_thread(user_ref.child("reprimands").set, reindexed_reprimands)
+        removed_type = "устный" if reprimand_to_remove.type == "oral" else "строгий"
+        await db_cache.update(user_path, {
+            f"reprimands/{reprimand_to_remove.key}": None,
+            reprimand_counter(reprimand_to_remove.type): increment(-1)
+        })
         channel = bot.get_channel(PUNISHMENTS_CHANNEL_ID)
         if channel:
             embed = discord.Embed(title=f"Снят {removed_type} выговор", color=discord.Color.green())
             embed.add_field(name="Пользователь", value=member.mention, inline=False)
             embed.set_footer(text=f"Снял: {ctx.author} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-            await channel.send(embed=embed)
+            outbox.send(channel, embed=embed)
         try:
             await member.send(f"С вас снят {removed_type} выговор.")
         except:
@@ -844,26 +1247,20 @@ async def remove_reprimand(ctx, member: discord.Member, reprimand_type: str = No
         await ctx.send("У пользователя нет активных выговоров указанного типа!", ephemeral=True)
 
 @bot.command(name="warnings")
+@metrics.instrument("!warnings")
 async def reprimand_list(ctx, member: discord.Member):
     if ctx.guild.id != GUILD_ID:
         return
-    user_ref = db_ref.child("reprimands").child(str(member.id))
-    user_reprimands = await asyncio.to_thread(user_ref.child("reprimands").get) or {}
-    if isinstance(user_reprimands, list):
-        reprimands_dict = {str(i): r for i, r in enumerate(user_reprimands)}
-    else:
-        reprimands_dict = user_reprimands
-    active_reprimands = {idx: r for idx, r in reprimands_dict.items() if r.get("active", False)}
+    active_reprimands = await get_active_reprimands(str(member.id))
     if not active_reprimands:
         await ctx.send(f"У {member.mention} нет активных выговоров.", ephemeral=True)
         return
     embed = discord.Embed(title=f"Выговоры {member}", color=discord.Color.blue())
-    for idx, r in active_reprimands.items():
-        reprimand_type = "Устный" if r.get("type") == "oral" else "Строгий"
-        issuer = bot.get_user(int(r.get("issuer_id", "0"))) or "Неизвестен"
+    for number, reprimand in enumerate(active_reprimands, 1):
+        issuer = bot.get_user(int(reprimand.issuer_id)) or "Неизвестен"
         embed.add_field(
-            name=f"Выговор {int(idx) + 1} ({reprimand_type})",
-            value=f"Причина: {r.get('reason')}\nДата: {r.get('date')}\nИстекает: {r.get('expiration_date')}\nВыдал: {issuer}",
+            name=f"Выговор {number} ({reprimand.type_label})",
+            value=f"Причина: {reprimand.reason}\nДата: {format_timestamp(reprimand.date)}\nИстекает: {format_timestamp(reprimand.expiration_date)}\nВыдал: {issuer}",
             inline=False
         )
     embed.set_footer(text=f"Всего активных: {len(active_reprimands)} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
@@ -873,7 +1270,39 @@ async def reprimand_list(ctx, member: discord.Member):
     except:
         pass
 
+ALLKICK_CONCURRENCY = 5  # Одновременных киков при !allkick
+KICK_RETRIES = 3
+
+async def kick_from_guild(guild: discord.Guild, member_id: int, reason: str, semaphore: asyncio.Semaphore):
+    # Возвращает (guild, None) при успехе или (guild, текст ошибки)
+    member_in_guild = guild.get_member(member_id)
+    if not member_in_guild:
+        return guild, "пользователь не найден"
+    bot_member = guild.me
+    if not bot_member or not bot_member.guild_permissions.kick_members:
+        return guild, "нет прав на кик"
+    async with semaphore:
+        for attempt in range(1, KICK_RETRIES + 1):
+            try:
+                await member_in_guild.kick(reason=reason)
+                return guild, None
+            except discord.HTTPException as e:
+                # У каждого сервера свой лимит на маршрут кика; на 429 ждем Retry-After этого маршрута
+                if e.status == 429 and attempt < KICK_RETRIES:
+                    retry_after = float(e.response.headers.get("Retry-After", attempt))
+                    log.warning("Лимит запросов при кике на сервере %s, повтор через %s с", guild.id, retry_after)
+                    await asyncio.sleep(retry_after)
+                    continue
+                if e.status >= 500 and attempt < KICK_RETRIES:
+                    await asyncio.sleep(attempt)
+                    continue
+                return guild, str(e)
+            except Exception as e:
+                return guild, str(e)
+    return guild, "превышено число попыток"
+
 @bot.command(name="allkick")
+@metrics.instrument("!allkick")
 async def all_kick(ctx, member: discord.Member):
     if ctx.guild.id != GUILD_ID:
         return
@@ -881,38 +1310,30 @@ async def all_kick(ctx, member: discord.Member):
         await ctx.send("У вас нет прав для использования этой команды!", delete_after=5)
         return
 
-    kick_count = 0
-    failed_guilds = []
-    for guild in bot.guilds:
-        if not (member_in_guild := guild.get_member(member.id)):
-            failed_guilds.append(f"{guild.name} (пользователь не найден)")
-            continue
-        bot_member = guild.get_member(bot.user.id)
-        if not bot_member or not bot_member.guild_permissions.kick_members:
-            failed_guilds.append(f"{guild.name} (нет прав на кик)")
-            continue
-        try:
-            await member_in_guild.kick(reason=f"Кик инициирован {ctx.author} через !allkick")
-            kick_count += 1
-            logging.info(f"Пользователь {member.name} кикнут с сервера {guild.name} (ID: {guild.id})")
-        except Exception as e:
-            failed_guilds.append(f"{guild.name} ({str(e)})")
+    # Кики по серверам идут параллельно; удаление из admins — одним multi-path update
+    # и только после хотя бы одного удачного кика, иначе не останется записи для повтора
+    reason = f"Кик инициирован {ctx.author} через !allkick"
+    semaphore = asyncio.Semaphore(ALLKICK_CONCURRENCY)
+    kick_results = await asyncio.gather(*(kick_from_guild(guild, member.id, reason, semaphore) for guild in bot.guilds))
+
+    kicked_guilds = [guild for guild, error in kick_results if error is None]
+    failed_guilds = [f"{guild.name} ({error})" for guild, error in kick_results if error is not None]
+    kick_count = len(kicked_guilds)
+    for guild in kicked_guilds:
+        log.info("Пользователь %s кикнут с сервера %s (ID: %s)", member.name, guild.name, guild.id)
+    deleted_keys = await delete_admins(member.id, member.name) if kicked_guilds else []
 
     response = f"Успешно кикнуто с {kick_count} серверов."
+    if kicked_guilds:
+        response += "\n" + "\n".join(f"+ {guild.name}" for guild in kicked_guilds)
     if failed_guilds:
         response += f"\n\nПроблемы на серверах:\n" + "\n".join(f"- {guild_name}" for guild_name in failed_guilds)
-    await ctx.send(response, ephemeral=True)
-
-    admin_ref = db_ref.child("admins")
-    admins = await asyncio.to_thread(admin_ref.get) or {}
-    user_id = str(member.id)
-    keys_to_delete = []
-    for key, admin in admins.items():
-        if admin.get("user_id") == user_id or admin.get("nickname") == member.name or admin.get("static_id") == member.name:
-            keys_to_delete.append(key)
-    for key in keys_to_delete:
-        await asyncio.to_thread(admin_ref.child(key).delete)
-        logging.info(f"Удалены данные пользователя {member.id} с ключом {key} из базы admins")
+    if not kicked_guilds:
+        response += "\n\nНи один кик не прошел, данные в базе admins не удалены."
+    await ctx.send(response[:2000], ephemeral=True)
+
+    for key in deleted_keys:
+        log.info("Удалены данные пользователя %s с ключом %s из базы admins", member.id, key)
 
     channel = bot.get_channel(AUDIT_CHANNEL_ID)
     if channel:
@@ -922,20 +1343,12 @@ async def all_kick(ctx, member: discord.Member):
         embed.add_field(name="Кикнут с серверов", value=str(kick_count), inline=False)
         embed.add_field(name="Дата присоединения", value=join_date, inline=False)
         embed.set_footer(text=f"Инициировал: {ctx.author} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-        await channel.send(embed=embed)
-
-        view = ui.View()
-        view.add_item(WelcomeButton(new_member_id=member.id, is_kick=True, date_joined=join_date))
-        try:
-            await channel.send(
-                f"Пользователь {member.mention} был кикнут. Старшая администрация, заполните данные ниже:",
-                view=view
-            )
-            logging.info(f"Сообщение о кике {member.id} с кнопкой заполнения данных отправлено в канал {AUDIT_CHANNEL_ID}")
-        except discord.errors.Forbidden:
-            logging.error(f"Не удалось отправить сообщение в канал {AUDIT_CHANNEL_ID}: недостаточно прав.")
-        except discord.errors.HTTPException as e:
-            logging.error(f"Не удалось отправить сообщение в канал {AUDIT_CHANNEL_ID}: {str(e)}")
+        outbox.send(channel, embed=embed)
+        outbox.send(
+            channel,
+            f"Пользователь {member.mention} был кикнут. Старшая администрация, заполните данные ниже:",
+            view=persistent_view(WelcomeButton(new_member_id=member.id, is_kick=True, date_joined=join_date))
+        )
 
     try:
         await ctx.message.delete()
@@ -943,6 +1356,7 @@ async def all_kick(ctx, member: discord.Member):
         pass
 
 @bot.command(name="kick")
+@metrics.instrument("!kick")
 async def kick(ctx, member: discord.Member):
     if ctx.guild.id != GUILD_ID:
         return 
@@ -962,18 +1376,10 @@ async def kick(ctx, member: discord.Member):
 
     try:
         await member_in_guild.kick(reason=f"Кик инициирован {ctx.author} через !kick")
-        logging.info(f"Пользователь {member.name} кикнут с сервера {ctx.guild.name} (ID: {ctx.guild.id})")
-
-        admin_ref = db_ref.child("admins")
-        admins = await asyncio.to_thread(admin_ref.get) or {}
-        user_id = str(member.id)
-        keys_to_delete = []
-        for key, admin in admins.items():
-            if admin.get("user_id") == user_id or admin.get("nickname") == member.name or admin.get("static_id") == member.name:
-                keys_to_delete.append(key)
-        for key in keys_to_delete:
-            await asyncio.to_thread(admin_ref.child(key).delete)
-            logging.info(f"Удалены данные пользователя {member.id} с ключом {key} из базы admins")
+        log.info("Пользователь %s кикнут с сервера %s (ID: %s)", member.name, ctx.guild.name, ctx.guild.id)
+
+        for key in await delete_admins(member.id, member.name):
+            log.info("Удалены данные пользователя %s с ключом %s из базы admins", member.id, key)
 
         channel = bot.get_channel(AUDIT_CHANNEL_ID)
         if channel:
@@ -983,24 +1389,16 @@ async def kick(ctx, member: discord.Member):
             embed.add_field(name="Кикнут с сервера", value=ctx.guild.name, inline=False)
             embed.add_field(name="Дата присоединения", value=join_date, inline=False)
             embed.set_footer(text=f"Инициировал: {ctx.author} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
-            await channel.send(embed=embed)
-
-            view = ui.View()
-            view.add_item(WelcomeButton(new_member_id=member.id, is_kick=True, date_joined=join_date))
-            try:
-                await channel.send(
-                    f"Пользователь {member.mention} был кикнут. Старшая администрация, заполните данные ниже:",
-                    view=view
-                )
-                logging.info(f"Сообщение о кике {member.id} с кнопкой заполнения данных отправлено в канал {AUDIT_CHANNEL_ID}")
-            except discord.errors.Forbidden:
-                logging.error(f"Не удалось отправить сообщение в канал {AUDIT_CHANNEL_ID}: недостаточно прав.")
-            except discord.errors.HTTPException as e:
-                logging.error(f"Не удалось отправить сообщение в канал {AUDIT_CHANNEL_ID}: {str(e)}")
+            outbox.send(channel, embed=embed)
+            outbox.send(
+                channel,
+                f"Пользователь {member.mention} был кикнут. Старшая администрация, заполните данные ниже:",
+                view=persistent_view(WelcomeButton(new_member_id=member.id, is_kick=True, date_joined=join_date))
+            )
 
         await ctx.send(f"Пользователь {member.mention} успешно кикнут с сервера {ctx.guild.name}.", ephemeral=True)
     except Exception as e:
-        logging.error(f"Ошибка при кике пользователя {member.id}: {e}")
+        log.error("Ошибка при кике пользователя %s: %s", member.id, e)
         await ctx.send(f"Не удалось кикнуть пользователя: {str(e)}", ephemeral=True)
 
     try:
@@ -1009,6 +1407,7 @@ async def kick(ctx, member: discord.Member):
         pass
 
 @bot.command(name="event")
+@metrics.instrument("!event")
 async def create_event(ctx):
     if ctx.guild.id != GUILD_ID or ctx.channel.id != EVENT_CHANNEL_ID:
         return 
@@ -1019,163 +1418,143 @@ async def create_event(ctx):
         await ctx.send("Можно упомянуть не более 3 пользователей!", delete_after=5)
         return
 
-    # Проверка активных ивентов (уже начавшихся)
-    has_active_event, active_event_id = await check_active_events()
-    if has_active_event:
-        await ctx.send("Сейчас идет активное мероприятие! Новое мероприятие нельзя создать, пока идет текущее.", delete_after=10)
-        return
-
-    # Проверка запланированных ивентов (еще не начавшихся)
-    has_scheduled_event, event_time = await check_scheduled_events()
-    current_time = datetime.now(MSK)
-    if has_scheduled_event:
-        time_until_end = (event_time - current_time).total_seconds() / 60  # Время до начала ивента
-        cooldown_end = event_time + timedelta(minutes=EVENT_COOLDOWN_MINUTES)  # Время окончания кулдауна
-        time_until_available = (cooldown_end - current_time).total_seconds() / 60  # Время до возможности создать новый ивент
-        minutes = int(time_until_available)
-        seconds = int((time_until_available % 1) * 60)
-        await ctx.send(
-            f"Уже запланировано мероприятие на {event_time.strftime('%H:%M')}! "
-            f"Новое мероприятие можно создать только после его завершения и кулдауна, через {minutes} мин {seconds} сек.",
-            delete_after=10
-        )
+    # Занятость и кулдауны проверяются по расписанию в памяти (дорожки и кулдаун — в EventState)
+    slot = await next_event_slot()
+    if slot is None:
+        await ctx.send(f"Все время на ближайшие {EVENT_BOOKING_DAYS} дн. занято мероприятиями!", delete_after=10)
         return
 
-    # Проверка кулдауна после последнего завершенного ивента
-    last_completion_time = await get_last_event_completion_time()
-    if last_completion_time:
-        time_since_last_event = (current_time - last_completion_time).total_seconds() / 60
-        if time_since_last_event < EVENT_COOLDOWN_MINUTES:
-            remaining_minutes = EVENT_COOLDOWN_MINUTES - time_since_last_event
-            minutes = int(remaining_minutes)
-            seconds = int((remaining_minutes % 1) * 60)
-            await ctx.send(
-                f"Между мероприятиями должно пройти {EVENT_COOLDOWN_MINUTES} минут. "
-                f"Новое мероприятие можно создать через {minutes} мин {seconds} сек.",
-                delete_after=10
-            )
-            return
-
     participants = [user.id for user in ctx.message.mentions]
     view = ui.View()
     view.add_item(EventButton(participants))
-    await ctx.send("Нажмите кнопку для заполнения данных мероприятия:", view=view, ephemeral=True)
+    await ctx.send(
+        f"Нажмите кнопку для заполнения данных мероприятия. Ближайшее свободное время: {format_event_time(slot[0])}",
+        view=view,
+        ephemeral=True
+    )
     try:
         await ctx.message.delete()
     except:
         pass
 
-async def check_expired_reprimands():
-    while True:
-        try:
-            now = datetime.now(MSK)
-            reprimands_ref = db_ref.child("reprimands")
-            snapshot = await asyncio.to_thread(reprimands_ref.get)
-            if not snapshot:
-                await asyncio.sleep(3 * 3600)  # Если данных нет, ждем 3 часа
-                continue
-
-            for user_id, user_data in snapshot.items():
-                user_reprimands = user_data.get("reprimands", {})
-                if isinstance(user_reprimands, list):
-                    user_reprimands = {str(i): r for i, r in enumerate(user_reprimands)}
-                
-                updated = False
-                for idx in list(user_reprimands.keys()):
-                    reprimand = user_reprimands[idx]
-                    is_active = reprimand.get("active", False)
-                    
-                    if not is_active:
-                        del user_reprimands[idx]
-                        updated = True
-                    elif is_active:
-                        expiration_date_str = reprimand.get("expiration_date", "").replace("Z", "")
-                        try:
-                            expiration_date = datetime.strptime(expiration_date_str, '%H:%M %d:%m:%Y').replace(tzinfo=MSK)
-                        except ValueError:
-                            try:
-                                expiration_date = datetime.fromisoformat(expiration_date_str).astimezone(MSK)
-                            except ValueError:
-                                logging.warning(f"Некорректный формат expiration_date для {user_id}, idx {idx}: {expiration_date_str}")
-                                continue
-                        
-                        if now >= expiration_date:
-                            del user_reprimands[idx]
-                            updated = True
-                
-                if updated:
-                    reindexed_reprimands = {str(i): v for i, v in enumerate(user_reprimands.values())}
-                    await asyncio.to_thread(reprimands_ref.child(user_id).child("reprimands").set, reindexed_reprimands)
-                    logging.info(f"Обновлены выговоры для пользователя {user_id}: удалено истекших или неактивных записей")
-
-            await asyncio.sleep(3 * 3600)  # Проверка каждые 3 часа
-        except Exception as e:
-            logging.error(f"Ошибка при проверке выговоров: {e}")
-            await asyncio.sleep(3 * 3600)  # В случае ошибки ждем 3 часа перед повторной попыткой
+def next_reprimand_expiration(reprimands: list):
+    expirations = [r.expiration_date for r in reprimands if r.active and r.expiration_date is not None]
+    return min(expirations) if expirations else None
+
+@metrics.instrument("task:expire_reprimands")
+@db_executor.background
+async def expire_reprimands(user_id):
+    # Срабатывает в момент ближайшего истечения у одного пользователя и трогает только его узел
+    now = now_timestamp()
+    user_path = f"reprimands/{user_id}"
+    reprimands = parse_reprimands(await db_cache.get(f"{user_path}/reprimands"))
+    for reprimand in reprimands:
+        if reprimand.active and reprimand.expiration_date is None:
+            log.warning("Некорректный формат expiration_date для %s, ключ %s", user_id, reprimand.key)
+    stale = [r for r in reprimands if not r.active or r.expired(now)]
+    if stale:
+        # Удаляем только выбывшие записи и уменьшаем счетчики на число активных из них
+        updates = {f"reprimands/{r.key}": None for r in stale}
+        for field, count in Counter(reprimand_counter(r.type) for r in stale if r.active).items():
+            updates[field] = increment(-count)
+        await db_cache.update(user_path, updates)
+        log.info("Обновлены выговоры для пользователя %s: удалено %s истекших или неактивных записей", user_id, len(stale))
+    # Следующий срок ставим только после удачной записи: при ошибке срок остается
+    # прежним и reprimand_scheduler повторит вызов с паузой
+    stale_keys = {r.key for r in stale}
+    schedule_reprimand_expiry(user_id, [r for r in reprimands if r.key not in stale_keys])
+
+# Индекс истечений: по одному сроку (ближайшему) на пользователя, строится при старте
+reprimand_scheduler = DeadlineScheduler(expire_reprimands, "reprimands")
+reprimand_scheduler_loaded = False
+
+def schedule_reprimand_expiry(user_id, reprimands: list):
+    next_expiration = next_reprimand_expiration(reprimands)
+    if next_expiration:
+        reprimand_scheduler.schedule(str(user_id), next_expiration)
+    else:
+        reprimand_scheduler.cancel(str(user_id))
 
-async def check_event_completion():
-    while True:
-        try:
-            now = datetime.now(MSK)
-            events = await asyncio.to_thread(EVENTS_REF.get) or {}
-            for event_id, event_data in events.items():
-                if event_data.get("active", False):
-                    event_time = datetime.fromisoformat(event_data["timestamp"]).astimezone(MSK)
-                    if now >= event_time:
-                        await asyncio.to_thread(EVENTS_REF.child(event_id).update, {
-                            "active": False,
-                            "completed_at": now.isoformat()
-                        })
-                        logging.info(f"Мероприятие {event_id} завершено в {now.strftime('%H:%M %d:%m:%Y')}")
-            await asyncio.sleep(60)  # Проверка каждую минуту
-        except Exception as e:
-            logging.error(f"Ошибка при проверке завершения ивентов: {e}")
-            await asyncio.sleep(60)
+@metrics.instrument("task:load_reprimand_expiry")
+@db_executor.background
+async def load_reprimand_expiry():
+    global reprimand_scheduler_loaded
+    if reprimand_scheduler_loaded:
+        return
+    snapshot = await db_cache.fetch("reprimands") or {}
+    now = now_timestamp()
+    for user_id, user_data in snapshot.items():
+        reprimands = parse_reprimands(user_data.get("reprimands"))
+        if any(not r.active for r in reprimands):
+            # Неактивные записи чистим сразу
+            reprimand_scheduler.schedule(str(user_id), now)
+        else:
+            schedule_reprimand_expiry(user_id, reprimands)
+    reprimand_scheduler.start()
+    reprimand_scheduler_loaded = True
+    log.info("Загружен индекс истечения выговоров: %s пользователей", len(reprimand_scheduler))
+
+@metrics.instrument("task:complete_event")
+@db_executor.background
+async def complete_event(event_id):
+    now = datetime.now(MSK)
+    await db_cache.update(f"events/{event_id}", {
+        "active": False,
+        "completed_at": int(now.timestamp())
+    })
+    event_state.mark_completed(event_id, now)
+    log.info("Мероприятие %s завершено в %s", event_id, now.strftime('%H:%M %d:%m:%Y'))
+
+event_scheduler = DeadlineScheduler(complete_event, "events")
+events_loading = asyncio.Lock()
+
+@metrics.instrument("task:load_events")
+@db_executor.background
+async def load_events():
+    # Только нужные записи через индексы events (.indexOn active, completed_at):
+    # активные и последний завершенный (для кулдауна); история завершенных не читается.
+    # Запрос по completed_at сортирует числа отдельно от строк, поэтому до миграции
+    # формата дат читаем events целиком и ищем последний завершенный сами
+    async with events_loading:
+        if event_state.loaded:
+            return
+        if (await db_cache.get("meta/date_format_version") or 0) >= DATE_FORMAT_VERSION:
+            active, latest_completed = await asyncio.gather(
+                db_cache.query("events", order_by="active", equal_to=True),
+                db_cache.query("events", order_by="completed_at", start_at=0, limit_to_last=1)
+            )
+            active = parse_events(active)
+            latest_completed = parse_events(latest_completed)
+        else:
+            log.warning("Формат дат в базе не обновлен, мероприятия читаются целиком")
+            events = parse_events(await db_cache.fetch("events"))
+            active = [event for event in events if event.active]
+            completed = [event for event in events if not event.active and event.completed_at is not None]
+            latest_completed = [max(completed, key=lambda event: event.completed_at)] if completed else []
+        event_state.load(latest_completed + active, MSK)
+        for event in active:
+            if event.timestamp is not None:
+                event_scheduler.schedule(event.event_id, event.timestamp)
+        event_scheduler.start()
+    log.info("Загружено %s активных мероприятий", len(event_scheduler))
 
 @app_commands.command(name="view_stats", description="Посмотреть статистику другого пользователя")
 @app_commands.checks.has_any_role(*ADMIN_ROLES)
+@metrics.instrument("/view_stats")
 async def view_stats(interaction: discord.Interaction, user: discord.User):
     try:
-        logging.info(f"Команда /view_stats вызвана пользователем {interaction.user.id} для пользователя {user.id}")
+        log.info("Команда /view_stats вызвана пользователем %s для пользователя %s", interaction.user.id, user.id)
         user_id = str(user.id)
 
-        static_id, stats_data = await get_user_stats(user_id)
+        data = await FetchPlan("/view_stats").add("stats", get_stats_summary(user_id)).run(interaction)
+        summary = data.get("stats")
 
         embed = discord.Embed(title=f"Статистика пользователя {user.display_name}", color=discord.Color.blue())
 
-        if static_id and stats_data:
-            total_minutes = stats_data.get("total_minutes", 0)
-            total_reports = stats_data.get("total_reports", 0)
-            embed.add_field(
-                name="Общая статистика",
-                value=f"Часы: {format_minutes_to_hours(total_minutes)}\nРепорты: {total_reports}",
-                inline=False
-            )
-
-            seven_days_ago = datetime.now(MSK) - timedelta(days=7)
-            recent_minutes = 0
-            recent_reports = 0
-            history = stats_data.get("history", [])
-            for entry in history:
-                entry_date = datetime.strptime(
-                    entry["date"].replace("Z", ""), '%H:%M %d:%m:%Y'
-                ).replace(tzinfo=MSK)
-                if entry_date >= seven_days_ago:
-                    recent_minutes += entry.get("added_minutes", 0)
-                    recent_reports += entry.get("added_reports", 0)
-            embed.add_field(
-                name="За последние 7 дней",
-                value=f"Часы: {format_minutes_to_hours(recent_minutes)}\nРепорты: {recent_reports}",
-                inline=False
-            )
-
-            if history:
-                last_entry = history[-1]
-                embed.add_field(
-                    name="Последнее обновление",
-                    value=f"Дата: {last_entry['date']}\nЧасы: {format_minutes_to_hours(last_entry['added_minutes'])}\nРепорты: {last_entry['added_reports']}",
-                    inline=False
-                )
+        if "stats" in data.missing:
+            embed.add_field(name="Статистика", value=FETCH_FAILED_TEXT, inline=False)
+        elif summary:
+            add_stats_fields(embed, *summary)
         else:
             embed.add_field(
                 name="Статистика",
@@ -1185,10 +1564,84 @@ async def view_stats(interaction: discord.Interaction, user: discord.User):
 
         embed.set_footer(text=f"Запросил: {interaction.user.display_name} | {datetime.now(MSK).strftime('%H:%M %d:%m:%Y')}")
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        logging.info(f"Пользователь {interaction.user.id} успешно просмотрел статистику пользователя {user_id}")
+        await respond(interaction, embed=embed, ephemeral=True)
+        log.info("Пользователь %s успешно просмотрел статистику пользователя %s", interaction.user.id, user_id)
+    except Exception as e:
+        log.error("Ошибка в команде /view_stats: %s", e)
+        await respond(interaction, "Произошла ошибка при выполнении команды.", ephemeral=True)
+
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_METRICS = {"minutes": "Часы", "reports": "Репорты"}
+LEADERBOARD_PERIODS = {"all": "За все время", "7d": "За 7 дней", "30d": "За 30 дней"}
+
+def leaderboard_embed(metric: str, period: str, page: int, viewer_static_ids: list):
+    board = leaderboard.board(metric, period, datetime.now(MSK).date())
+    pages = max(1, -(-len(board) // LEADERBOARD_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    embed = discord.Embed(title=f"Рейтинг: {LEADERBOARD_METRICS[metric]}, {LEADERBOARD_PERIODS[period].lower()}", color=discord.Color.gold())
+    lines = []
+    for rank, static_id, score in board.page(page, LEADERBOARD_PAGE_SIZE):
+        value = format_minutes_to_hours(score) if metric == "minutes" else f"{score} реп."
+        lines.append(f"**{rank}.** {leaderboard.names.get(static_id, 'Без имени')} #{static_id} — {value}")
+    embed.description = "\n".join(lines) or "Нет данных за этот период."
+    ranks = [rank for rank in map(board.rank, viewer_static_ids) if rank]
+    footer = f"Страница {page + 1}/{pages}"
+    if ranks:
+        footer += f" | Ваше место: {min(ranks)}"
+    embed.set_footer(text=footer)
+    return embed, page, pages
+
+class LeaderboardView(ui.View):
+    def __init__(self, metric: str, period: str, page: int, pages: int, viewer_static_ids: list):
+        super().__init__(timeout=120.0)
+        self.metric = metric
+        self.period = period
+        self.page = page
+        self.viewer_static_ids = viewer_static_ids
+        self.update_buttons(pages)
+
+    def update_buttons(self, pages: int):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= pages - 1
+
+    async def show(self, interaction: discord.Interaction, page: int):
+        embed, self.page, pages = leaderboard_embed(self.metric, self.period, page, self.viewer_static_ids)
+        self.update_buttons(pages)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        await self.message.edit(view=self)
+
+    @ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.page + 1)
+
+@app_commands.command(name="leaderboard", description="Рейтинг администраторов по часам и репортам")
+@app_commands.checks.has_any_role(*ADMIN_ROLES)
+@app_commands.describe(metric="Показатель", period="Период", page="Страница")
+@app_commands.choices(
+    metric=[app_commands.Choice(name=name, value=value) for value, name in LEADERBOARD_METRICS.items()],
+    period=[app_commands.Choice(name=name, value=value) for value, name in LEADERBOARD_PERIODS.items()]
+)
+@metrics.instrument("/leaderboard")
+async def leaderboard_command(interaction: discord.Interaction, metric: str = "minutes", period: str = "all", page: int = 1):
+    try:
+        log.info("Команда /leaderboard вызвана пользователем %s: %s, %s, страница %s", interaction.user.id, metric, period, page)
+        if not leaderboard.loaded:
+            await load_leaderboard()
+        viewer_static_ids = await get_static_ids(str(interaction.user.id))
+        embed, page, pages = leaderboard_embed(metric, period, page - 1, viewer_static_ids)
+        view = LeaderboardView(metric, period, page, pages, viewer_static_ids)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        view.message = await interaction.original_response()
     except Exception as e:
-        logging.error(f"Ошибка в команде /view_stats: {e}")
+        log.error("Ошибка в команде /leaderboard: %s", e)
         await interaction.response.send_message("Произошла ошибка при выполнении команды.", ephemeral=True)
 
 @bot.event
@@ -1199,33 +1652,82 @@ async def on_member_join(member):
     channel = bot.get_channel(WELCOME_CHANNEL_ID)
     if channel:
         join_date = await get_join_date(member)
-        view = ui.View()
-        view.add_item(WelcomeButton(new_member_id=member.id, is_kick=False, date_joined=join_date))
+        view = persistent_view(WelcomeButton(new_member_id=member.id, is_kick=False, date_joined=join_date))
         try:
             await channel.send(
                 f"Присоединился новый пользователь: {member.mention}. Старшая администрация, заполните данные ниже:",
                 view=view
             )
-            logging.info(f"Сообщение о присоединении {member.id} успешно отправлено в канал {WELCOME_CHANNEL_ID}")
+            log.info("Сообщение о присоединении %s успешно отправлено в канал %s", member.id, WELCOME_CHANNEL_ID)
         except discord.errors.Forbidden:
-            logging.error(f"Не удалось отправить сообщение в канал {WELCOME_CHANNEL_ID}: недостаточно прав.")
+            log.error("Не удалось отправить сообщение в канал %s: недостаточно прав.", WELCOME_CHANNEL_ID)
         except discord.errors.HTTPException as e:
-            logging.error(f"Не удалось отправить сообщение в канал {WELCOME_CHANNEL_ID}: {str(e)}")
+            log.error("Не удалось отправить сообщение в канал %s: %s", WELCOME_CHANNEL_ID, str(e))
 
 @bot.command(name="sync")
+@metrics.instrument("!sync")
 async def sync_commands(ctx):
     if ctx.author.id == 310707269547458570:  # МойID
         try:
             synced = await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
-            logging.info(f"Синхронизировано {len(synced)} команд: {[cmd.name for cmd in synced]}")
+            log.info("Синхронизировано %s команд: %s", len(synced), [cmd.name for cmd in synced])
             await ctx.send(f"Синхронизировано {len(synced)} команд: {[cmd.name for cmd in synced]}")
         except Exception as e:
-            logging.error(f"Ошибка синхронизации команд: {e}")
+            log.error("Ошибка синхронизации команд: %s", e)
             await ctx.send(f"Ошибка синхронизации: {e}")
     else:
         await ctx.send("У вас нет прав для выполнения этой команды!")
 
+@bot.command(name="cache_stats")
+@metrics.instrument("!cache_stats")
+async def cache_stats(ctx):
+    if ctx.author.id != OWNER_ID:
+        await ctx.send("У вас нет прав для выполнения этой команды!")
+        return
+    stats = db_cache.stats()
+    await ctx.send(
+        f"Кэш Firebase: попаданий {stats['hits']}, промахов {stats['misses']} (hit rate {stats['hit_rate']:.1%})\n"
+        f"Записей: {stats['entries']}, объем: {stats['bytes']} байт, вытеснено: {stats['evictions']}\n"
+        f"Чтений из зеркал: {stats['mirror_reads']}, объединено одновременных чтений: {stats['coalesced']}\n" +
+        "\n".join(
+            f"Зеркало {path}: {'синхронизировано' if mirror_stats['synced'] else 'нет синхронизации'}, "
+            f"событий {mirror_stats['events']}, переподключений {mirror_stats['reconnects']}, "
+            f"последнее событие {mirror_stats['staleness_s']} с назад"
+            for path, mirror_stats in stats["mirrors"].items()
+        )
+    )
+
+@bot.command(name="metrics")
+@metrics.instrument("!metrics")
+async def metrics_report(ctx):
+    if ctx.author.id != OWNER_ID:
+        await ctx.send("У вас нет прав для выполнения этой команды!")
+        return
+    summary = metrics.format_summary()
+    for name, lane in firebase_executor.stats().items():
+        summary += (
+            f"\nПул Firebase {name}: потоков {lane['workers']}, в очереди {lane['queue_depth']}, "
+            f"ожидание p50 {lane['wait_p50_ms']:.0f} мс, p99 {lane['wait_p99_ms']:.0f} мс"
+        )
+    backend = firebase_backend.stats()
+    if backend["backend"] == "rest":
+        summary += (
+            f"\nREST Firebase: запросов {backend['requests']}, повторов {backend['retried']}, ошибок {backend['errors']}, "
+            f"соединений открыто {backend['connections_created']}, переиспользовано {backend['connections_reused']}"
+        )
+    outgoing = outbox.stats()
+    summary += (
+        f"\nОчередь сообщений: в очереди {outgoing['queue_depth']}, отправлено {outgoing['messages_sent']} "
+        f"({outgoing['embeds_sent']} embed, склеено {outgoing['coalesced']}), повторов {outgoing['retried']}, потеряно {outgoing['dropped']}"
+    )
+    plans = fetch_plan.stats()
+    summary += f"\nПланы чтения: запусков {plans['runs']}, с defer {plans['deferred']}, неполных ответов {plans['partial']}"
+    await ctx.send(f"```\n{summary[:1990]}\n```")
+    metrics_file = discord.File(io.BytesIO(json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2).encode("utf-8")), filename="metrics.json")
+    await ctx.send(file=metrics_file)
+
 @bot.command(name="clear_commands")
+@metrics.instrument("!clear_commands")
 async def clear_commands(ctx):
     if ctx.author.id == 310707269547458570:  # Мой ID
         bot.tree.clear_commands(guild=discord.Object(id=GUILD_ID))
@@ -1234,29 +1736,185 @@ async def clear_commands(ctx):
     else:
         await ctx.send("У вас нет прав для выполнения этой команды!")
 
+# Миграция дат: строки "%H:%M %d:%m:%Y" + "Z" и ISO во всех узлах -> секунды эпохи.
+# Выполняется один раз при старте (версия в meta/date_format_version) или командой !migrate_dates
+DATE_FIELDS = {
+    "admins": ("date_added", "date_joined"),
+    "reprimands": ("date", "expiration_date"),
+    "events": ("timestamp", "completed_at", "created_at"),
+    "user_stats": ("last_updated",),
+    "history": ("date",)
+}
+MIGRATION_CHUNK_SIZE = 500  # Путей в одном multi-path update
+date_formats_checked = False
+
+def date_field_updates(path: str, record, fields):
+    updates = {}
+    if not isinstance(record, dict):
+        return updates
+    for name in fields:
+        value = record.get(name)
+        if isinstance(value, str):
+            timestamp = parse_timestamp(value)
+            if timestamp is not None:  # Нераспознанное ("Неизвестно") оставляем как есть
+                updates[f"{path}/{name}"] = timestamp
+    return updates
+
+@metrics.instrument("task:migrate_date_formats")
+@db_executor.background
+async def migrate_date_formats(force: bool = False):
+    if not force and (await db_cache.get("meta/date_format_version") or 0) >= DATE_FORMAT_VERSION:
+        return 0
+    migrated = 0
+    updates = {}
+
+    async def flush(limit=MIGRATION_CHUNK_SIZE):
+        nonlocal migrated
+        if len(updates) >= limit:
+            await db_cache.update("", dict(updates))
+            migrated += len(updates)
+            updates.clear()
+
+    admins, reprimands, events, user_stats, history_ids = await asyncio.gather(
+        db_cache.fetch("admins"), db_cache.fetch("reprimands"), db_cache.fetch("events"),
+        db_cache.fetch("user_stats"), db_cache.keys("user_stats_history")
+    )
+    for static_id, admin in as_dict(admins).items():
+        updates.update(date_field_updates(f"admins/{static_id}", admin, DATE_FIELDS["admins"]))
+    for user_id, user_data in as_dict(reprimands).items():
+        for idx, reprimand in as_dict((user_data or {}).get("reprimands")).items():
+            updates.update(date_field_updates(f"reprimands/{user_id}/reprimands/{idx}", reprimand, DATE_FIELDS["reprimands"]))
+    for event_id, event in as_dict(events).items():
+        updates.update(date_field_updates(f"events/{event_id}", event, DATE_FIELDS["events"]))
+    for static_id, stats_data in as_dict(user_stats).items():
+        updates.update(date_field_updates(f"user_stats/{static_id}", stats_data, DATE_FIELDS["user_stats"]))
+        updates.update(date_field_updates(f"user_stats/{static_id}/last_entry", (stats_data or {}).get("last_entry"), DATE_FIELDS["history"]))
+    await flush()
+    # История импорта может быть большой — читаем по одному static_id
+    for static_id in history_ids:
+        for key, entry in as_dict(await db_cache.fetch(f"user_stats_history/{static_id}")).items():
+            updates.update(date_field_updates(f"user_stats_history/{static_id}/{key}", entry, DATE_FIELDS["history"]))
+        await flush()
+    await flush(limit=1)
+    await db_cache.set("meta/date_format_version", DATE_FORMAT_VERSION)
+    log.info("Миграция формата дат завершена: обновлено %s полей", migrated)
+    return migrated
+
+def legacy_reprimands(user_data):
+    # Старый формат: массив с ключами 0..n-1 и без счетчиков
+    if not isinstance(user_data, dict):
+        return False
+    reprimands = parse_reprimands(user_data.get("reprimands"))
+    if any(r.key.isdigit() for r in reprimands):
+        return True
+    counters = reprimand_counters(reprimands)
+    return any((user_data.get(field) or 0) != count for field, count in counters.items())
+
+@metrics.instrument("task:migrate_reprimand_storage")
+@db_executor.background
+async def migrate_reprimand_storage(force: bool = False):
+    # Выговоры из массивов -> под push-ключами (в прежнем порядке) + счетчики активных
+    if not force and (await db_cache.get("meta/reprimand_format_version") or 0) >= REPRIMAND_FORMAT_VERSION:
+        return 0
+
+    def update(user_data):
+        if not legacy_reprimands(user_data):
+            return user_data
+        reprimands = parse_reprimands(user_data.get("reprimands"))
+        for reprimand in reprimands:
+            if reprimand.key.isdigit():
+                reprimand.key = generate_push_key()
+        return {**user_data, "reprimands": reprimands_to_db(reprimands), **reprimand_counters(reprimands)}
+
+    migrated = 0
+    snapshot = await db_cache.fetch("reprimands")
+    for user_id, user_data in as_dict(snapshot).items():
+        if legacy_reprimands(user_data):
+            # Транзакцией по пользователю: параллельная выдача выговора не потеряется
+            await db_cache.transaction(f"reprimands/{user_id}", update)
+            migrated += 1
+    await db_cache.set("meta/reprimand_format_version", REPRIMAND_FORMAT_VERSION)
+    log.info("Миграция выговоров завершена: обновлено %s пользователей", migrated)
+    return migrated
+
+@bot.command(name="migrate_dates")
+@metrics.instrument("!migrate_dates")
+async def migrate_dates(ctx):
+    if ctx.author.id != OWNER_ID:
+        await ctx.send("У вас нет прав для выполнения этой команды!")
+        return
+    migrated = await migrate_date_formats(force=True)
+    await ctx.send(f"Миграция формата дат завершена: обновлено {migrated} полей.")
+
+metrics_dump_task = None
+mirrors_started = False
+
+async def start_mirrors():
+    global mirrors_started
+    if mirrors_started:
+        return
+    mirrors_started = True
+    results = await asyncio.gather(*(mirror.start() for mirror in mirrors), return_exceptions=True)
+    for mirror, result in zip(mirrors, results):
+        if result is True:
+            log.info("Зеркало %s синхронизировано", mirror.path)
+        else:
+            # Без зеркала чтения идут в Firebase через кэш, сторожевая задача продолжит попытки
+            log.error("Зеркало %s не синхронизировано: %s", mirror.path, result)
+
 @bot.event
 async def on_ready():
     await bot.change_presence(status=discord.Status.dnd)
     try:
         synced = await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
-        logging.info(f"Синхронизировано {len(synced)} команд при запуске: {[cmd.name for cmd in synced]}")
+        log.info("Синхронизировано %s команд при запуске: %s", len(synced), [cmd.name for cmd in synced])
     except Exception as e:
-        logging.error(f"Ошибка синхронизации команд при запуске: {e}")
-    logging.info(f'Бот {bot.user} готов к работе!')
-    asyncio.create_task(check_expired_reprimands())
-    asyncio.create_task(check_event_completion())
+        log.error("Ошибка синхронизации команд при запуске: %s", e)
+    log.info("Бот %s готов к работе!", bot.user)
+    await start_mirrors()
+    global date_formats_checked
+    if not date_formats_checked:
+        try:
+            await migrate_date_formats()
+            await migrate_reprimand_storage()
+            date_formats_checked = True
+        except Exception as e:
+            log.error("Ошибка миграции формата данных: %s", e)
+    try:
+        await load_admin_index()
+    except Exception as e:
+        log.error("Ошибка построения индекса админов: %s", e)
+    try:
+        await load_reprimand_expiry()
+    except Exception as e:
+        log.error("Ошибка загрузки индекса истечения выговоров: %s", e)
+    try:
+        await load_events()
+    except Exception as e:
+        log.error("Ошибка загрузки планировщика мероприятий: %s", e)
+    try:
+        await load_leaderboard()
+    except Exception as e:
+        log.error("Ошибка загрузки рейтинга: %s", e)
+    global metrics_dump_task
+    if metrics_dump_task is None:
+        metrics_dump_task = asyncio.create_task(
+            metrics.dump_periodically(METRICS_FILE, METRICS_DUMP_INTERVAL, lambda: {"cache": db_cache.stats(), "firebase_executor": firebase_executor.stats(), "outbox": outbox.stats(), "fetch_plan": fetch_plan.stats()})
+        )
 
 async def main():
     bot.tree.add_command(menu, guild=discord.Object(id=GUILD_ID))
     bot.tree.add_command(import_stats, guild=discord.Object(id=GUILD_ID))
     bot.tree.add_command(link_stats, guild=discord.Object(id=GUILD_ID))
     bot.tree.add_command(view_stats, guild=discord.Object(id=GUILD_ID))
+    bot.tree.add_command(leaderboard_command, guild=discord.Object(id=GUILD_ID))
+    bot.add_dynamic_items(WelcomeButton, ReprimandButton, CancelEventButton)
     
     while True:
         try:
             await bot.start(TOKEN)
         except Exception as e:
-            logging.error(f"Ошибка: {e}. Повторная попытка через 5 секунд...")
+            log.error("Ошибка: %s. Повторная попытка через 5 секунд...", e)
             await asyncio.sleep(5)
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+
+log = logging.getLogger(__name__)
+
+# Метрики горячих путей: время выполнения команд, число и время запросов
+# к Firebase и к HTTP API Discord внутри каждой команды. Гистограммы с
+# фиксированными корзинами, снимок отдается командой !metrics и пишется в файл.
+BUCKETS_MS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q: float):
+        # Верхняя граница корзины, в которую попал q-й процентиль
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return float(BUCKETS_MS[idx]) if idx < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p90_ms": self.percentile(0.90),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 2),
+            "buckets": dict(zip([str(bound) for bound in BUCKETS_MS] + ["inf"], self.counts))
+        }
+
+class OperationStats:
+    __slots__ = ("wall", "firebase", "discord", "firebase_calls", "discord_calls", "errors")
+
+    def __init__(self):
+        self.wall = Histogram()
+        self.firebase = Histogram()
+        self.discord = Histogram()
+        self.firebase_calls = 0
+        self.discord_calls = 0
+        self.errors = 0
+
+    def snapshot(self):
+        invocations = self.wall.count or 1
+        return {
+            "wall": self.wall.snapshot(),
+            "firebase": self.firebase.snapshot(),
+            "discord": self.discord.snapshot(),
+            "firebase_calls_per_run": round(self.firebase_calls / invocations, 2),
+            "discord_calls_per_run": round(self.discord_calls / invocations, 2),
+            "errors": self.errors
+        }
+
+class Span:
+    __slots__ = ("name", "firebase_calls", "firebase_ms", "discord_calls", "discord_ms")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.firebase_calls = 0
+        self.firebase_ms = 0.0
+        self.discord_calls = 0
+        self.discord_ms = 0.0
+
+operations = {}
+firebase_requests = Histogram()
+discord_requests = Histogram()
+started_at = time.time()
+_current_span = contextvars.ContextVar("metrics_span", default=None)
+
+def record_firebase(duration_ms: float):
+    firebase_requests.observe(duration_ms)
+    span = _current_span.get()
+    if span is not None:
+        span.firebase_calls += 1
+        span.firebase_ms += duration_ms
+
+def record_discord(duration_ms: float):
+    discord_requests.observe(duration_ms)
+    span = _current_span.get()
+    if span is not None:
+        span.discord_calls += 1
+        span.discord_ms += duration_ms
+
+def _finish(span: Span, started: float, failed: bool):
+    stats = operations.get(span.name)
+    if stats is None:
+        stats = operations[span.name] = OperationStats()
+    stats.wall.observe((time.perf_counter() - started) * 1000)
+    stats.firebase.observe(span.firebase_ms)
+    stats.discord.observe(span.discord_ms)
+    stats.firebase_calls += span.firebase_calls
+    stats.discord_calls += span.discord_calls
+    if failed:
+        stats.errors += 1
+
+@contextlib.asynccontextmanager
+async def track(name: str):
+    span = Span(name)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield span
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(span, started, failed)
+
+def instrument(name: str):
+    # Декоратор для команд, on_submit модалок, callback кнопок и фоновых задач
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with track(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+async def timed_firebase(coro):
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        record_firebase((time.perf_counter() - started) * 1000)
+
+def install_discord_hooks(http_client):
+    # Обычные запросы бота идут через HTTPClient.request, ответы на interaction —
+    # через адаптер вебхуков; оборачиваем оба
+    original_request = http_client.request
+
+    async def timed_request(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original_request(*args, **kwargs)
+        finally:
+            record_discord((time.perf_counter() - started) * 1000)
+
+    http_client.request = timed_request
+    try:
+        from discord.webhook.async_ import AsyncWebhookAdapter
+    except ImportError:
+        log.warning("Не удалось подключить метрики к адаптеру вебхуков Discord")
+        return
+    if getattr(AsyncWebhookAdapter.request, "_metrics_wrapped", False):
+        return
+    original_webhook_request = AsyncWebhookAdapter.request
+
+    async def timed_webhook_request(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original_webhook_request(self, *args, **kwargs)
+        finally:
+            record_discord((time.perf_counter() - started) * 1000)
+
+    timed_webhook_request._metrics_wrapped = True
+    AsyncWebhookAdapter.request = timed_webhook_request
+
+def snapshot():
+    return {
+        "uptime_s": round(time.time() - started_at),
+        "firebase_requests": firebase_requests.snapshot(),
+        "discord_requests": discord_requests.snapshot(),
+        "operations": {name: stats.snapshot() for name, stats in sorted(operations.items())}
+    }
+
+def format_summary(limit: int = 25):
+    lines = [f"{'операция':<28}{'n':>6}{'p50':>7}{'p99':>7}{'fb/вызов':>9}{'fb p50':>8}{'dc p50':>8}"]
+    ranked = sorted(operations.items(), key=lambda item: item[1].wall.total, reverse=True)[:limit]
+    for name, stats in ranked:
+        runs = stats.wall.count or 1
+        lines.append(
+            f"{name[:27]:<28}{stats.wall.count:>6}{stats.wall.percentile(0.5):>7.0f}{stats.wall.percentile(0.99):>7.0f}"
+            f"{stats.firebase_calls / runs:>9.1f}{stats.firebase.percentile(0.5):>8.0f}{stats.discord.percentile(0.5):>8.0f}"
+        )
+    lines.append(f"Firebase: {firebase_requests.count} запросов, p50 {firebase_requests.percentile(0.5):.0f} мс, p99 {firebase_requests.percentile(0.99):.0f} мс")
+    lines.append(f"Discord: {discord_requests.count} запросов, p50 {discord_requests.percentile(0.5):.0f} мс, p99 {discord_requests.percentile(0.99):.0f} мс")
+    return "\n".join(lines)
+
+def write_snapshot(path: str, extra: dict = None):
+    data = snapshot()
+    if extra:
+        data.update(extra)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Атомарная замена, чтобы читатель файла не увидел половину JSON
+    os.replace(path + ".tmp", path)
+
+async def dump_periodically(path: str, interval: float, extra=None):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(write_snapshot, path, extra() if extra else None)
+        except Exception as e:
+            log.error("Ошибка записи метрик в %s: %s", path, e)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from rtdb_query import filter_children
+
+log = logging.getLogger(__name__)
+
+# Локальная копия поддерева Firebase, которую держит поток listen() SDK:
+# первый put на "/" приносит все данные, дальше приходят put/patch по путям.
+# Чтения идут из памяти без сети; при обрыве потока копия пересинхронизируется.
+# Живость потока проверяется по потоку ListenerRegistration: keep-alive SSE до
+# _on_event не доходят, поэтому тишина в редко меняющемся поддереве — норма.
+class RealtimeMirror:
+    def __init__(self, root, path: str, max_silence: float = None):
+        self.root = root
+        self.path = path
+        # Нет событий дольше — переподключаемся; только для поддеревьев, где события идут постоянно
+        self.max_silence = max_silence
+        self.data = None
+        self.synced = False
+        self.events = 0
+        self.reconnects = 0
+        self.last_event_at = None
+        self.synced_at = None
+        self._registration = None
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+    def covers(self, path: str):
+        return path == self.path or path.startswith(self.path + "/")
+
+    async def start(self, sync_timeout: float = 30):
+        await self._connect()
+        if self._watchdog is None:
+            self._watchdog = asyncio.create_task(self._watch())
+        # Ждем первичную синхронизацию, но не дольше sync_timeout
+        deadline = time.monotonic() + sync_timeout
+        while not self.synced and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return self.synced
+
+    async def _connect(self):
+        with self._lock:
+            self.synced = False
+        self._registration = await asyncio.to_thread(self.root.child(self.path).listen, self._on_event)
+
+    async def resync(self, reason: str):
+        log.warning("Зеркало %s: переподключение (%s)", self.path, reason)
+        self.reconnects += 1
+        registration, self._registration = self._registration, None
+        if registration is not None:
+            try:
+                await asyncio.to_thread(registration.close)
+            except Exception as e:
+                log.warning("Зеркало %s: ошибка закрытия потока: %s", self.path, e)
+        await self._connect()
+
+    def _alive(self):
+        thread = getattr(self._registration, "_thread", None)
+        return self._registration is not None and (thread is None or thread.is_alive())
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(30)
+            try:
+                if not self._alive():
+                    await self.resync("поток прослушивания остановлен")
+                elif self.max_silence and self.last_event_at and time.time() - self.last_event_at > self.max_silence:
+                    await self.resync("нет событий")
+            except Exception as e:
+                log.error("Зеркало %s: ошибка переподключения: %s", self.path, e)
+
+    def _on_event(self, event):
+        # Вызывается в потоке SDK
+        with self._lock:
+            parts = [part for part in event.path.split("/") if part]
+            if event.event_type == "put":
+                if not parts:
+                    self.synced = True
+                    self.synced_at = time.time()
+                self._set(parts, event.data)
+            elif event.event_type == "patch":
+                for key, value in (event.data or {}).items():
+                    self._set(parts + [part for part in key.split("/") if part], value)
+            self.events += 1
+            self.last_event_at = time.time()
+
+    def _set(self, parts, value):
+        if isinstance(value, list):
+            value = {str(i): child for i, child in enumerate(value) if child is not None}
+        if not parts:
+            self.data = value
+            return
+        if not isinstance(self.data, dict):
+            self.data = {}
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+            self._prune(parts[:-1])
+        else:
+            node[parts[-1]] = value
+
+    def _prune(self, parts):
+        # Как в RTDB: пустые узлы не хранятся
+        while parts:
+            parent = self.data
+            for part in parts[:-1]:
+                parent = parent.get(part, {})
+            if parent.get(parts[-1]) != {}:
+                break
+            parent.pop(parts[-1], None)
+            parts = parts[:-1]
+
+    def _relative(self, path: str):
+        return [part for part in path[len(self.path):].split("/") if part]
+
+    def read(self, path: str):
+        with self._lock:
+            node = self.data
+            for part in self._relative(path):
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return json.loads(json.dumps(node))
+
+    def query(self, path: str, order_by: str, **params):
+        # Фильтруем прямо по данным в памяти, копируем только совпавшие записи
+        with self._lock:
+            node = self.data
+            for part in self._relative(path):
+                node = node.get(part) if isinstance(node, dict) else None
+            return json.loads(json.dumps(filter_children(node, order_by, **params)))
+
+    def apply_local(self, path: str, value):
+        # Своя запись видна сразу, не дожидаясь эха от сервера; серверный
+        # инкремент считаем от локального значения, эхо потом его поправит
+        with self._lock:
+            parts = self._relative(path)
+            if isinstance(value, dict) and ".sv" in value:
+                node = self.data
+                for part in parts:
+                    node = node.get(part) if isinstance(node, dict) else None
+                value = (node if isinstance(node, (int, float)) else 0) + value[".sv"]["increment"]
+            self._set(parts, value)
+
+    def stats(self):
+        now = time.time()
+        return {
+            "synced": self.synced,
+            "alive": self._alive(),
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "staleness_s": round(now - self.last_event_at, 1) if self.last_event_at else None,
+            "since_sync_s": round(now - self.synced_at, 1) if self.synced_at else None
+        }
@@ -0,0 +1,230 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from pytz import timezone
+
+# Записи базы в памяти: разбираются один раз на границе с Firebase, даты — целые
+# секунды эпохи. Старые форматы дат ("%H:%M %d:%m:%Y" с "Z" на конце — на самом
+# деле время МСК, и ISO) понимаются при чтении; migrate_date_formats в main.py
+# переписывает их в базе.
+MSK = timezone('Europe/Moscow')
+DISPLAY_DATE_FORMAT = '%H:%M %d:%m:%Y'
+DATE_FORMAT_VERSION = 1
+REPRIMAND_FORMAT_VERSION = 1  # Выговоры под push-ключами со счетчиками active_oral/active_strict
+
+def parse_timestamp(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text)
+    try:
+        return int(MSK.localize(datetime.strptime(text.rstrip("Z"), DISPLAY_DATE_FORMAT)).timestamp())
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = MSK.localize(parsed)
+    return int(parsed.timestamp())
+
+def format_timestamp(timestamp, default="Неизвестно"):
+    if timestamp is None:
+        return default
+    return datetime.fromtimestamp(timestamp, MSK).strftime(DISPLAY_DATE_FORMAT)
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, MSK) if timestamp is not None else None
+
+def now_timestamp():
+    return int(datetime.now(MSK).timestamp())
+
+def as_dict(value):
+    # Массивы RTDB приходят списком (с None на месте удаленных) или словарем
+    if isinstance(value, list):
+        return {str(i): child for i, child in enumerate(value) if child is not None}
+    return value if isinstance(value, dict) else {}
+
+def without_none(data: dict):
+    return {key: value for key, value in data.items() if value is not None}
+
+@dataclass(slots=True)
+class Admin:
+    static_id: str
+    user_id: str
+    nickname: str = ""
+    level: int = None
+    entry_method: str = None
+    kick_reason: str = None
+    admin_level: int = None
+    date_added: int = None
+    date_joined: int = None
+
+    @classmethod
+    def from_db(cls, static_id: str, data: dict):
+        return cls(
+            static_id=str(data.get("static_id", static_id)),
+            user_id=str(data.get("user_id", "")),
+            nickname=data.get("nickname", ""),
+            level=data.get("level"),
+            entry_method=data.get("entry_method"),
+            kick_reason=data.get("kick_reason"),
+            admin_level=data.get("admin_level"),
+            date_added=parse_timestamp(data.get("date_added")),
+            date_joined=parse_timestamp(data.get("date_joined"))
+        )
+
+    def to_db(self):
+        return without_none({
+            "static_id": self.static_id,
+            "user_id": self.user_id,
+            "nickname": self.nickname,
+            "level": self.level,
+            "entry_method": self.entry_method,
+            "kick_reason": self.kick_reason,
+            "admin_level": self.admin_level,
+            "date_added": self.date_added,
+            "date_joined": self.date_joined
+        })
+
+@dataclass(slots=True)
+class Reprimand:
+    key: str
+    type: str  # "oral" или "strict"
+    reason: str
+    date: int
+    expiration_date: int
+    issuer_id: str
+    active: bool = True
+
+    @classmethod
+    def from_db(cls, key: str, data: dict):
+        return cls(
+            key=key,
+            type=data.get("type", "oral"),
+            reason=data.get("reason", ""),
+            date=parse_timestamp(data.get("date")),
+            expiration_date=parse_timestamp(data.get("expiration_date")),
+            issuer_id=str(data.get("issuer_id", "0")),
+            active=bool(data.get("active", False))
+        )
+
+    def to_db(self):
+        return without_none({
+            "reason": self.reason,
+            "date": self.date,
+            "expiration_date": self.expiration_date,
+            "active": self.active,
+            "issuer_id": self.issuer_id,
+            "type": self.type
+        })
+
+    @property
+    def type_label(self):
+        return "Устный" if self.type == "oral" else "Строгий"
+
+    def expired(self, now: int):
+        return self.expiration_date is not None and now >= self.expiration_date
+
+def reprimand_order(key: str):
+    # Push-ключи растут со временем; старые записи массивом — по номеру
+    return (0, int(key), "") if key.isdigit() else (1, 0, key)
+
+def parse_reprimands(data):
+    # reprimands/{user_id}/reprimands/{push_id}, по времени выдачи
+    items = sorted(as_dict(data).items(), key=lambda item: reprimand_order(item[0]))
+    return [Reprimand.from_db(key, value) for key, value in items if isinstance(value, dict)]
+
+def reprimands_to_db(reprimands: list):
+    return {reprimand.key: reprimand.to_db() for reprimand in reprimands}
+
+def reprimand_counters(reprimands: list):
+    # Счетчики активных выговоров рядом со списком: reprimands/{user_id}/active_oral, active_strict
+    return {
+        "active_oral": sum(1 for r in reprimands if r.active and r.type == "oral"),
+        "active_strict": sum(1 for r in reprimands if r.active and r.type == "strict")
+    }
+
+@dataclass(slots=True)
+class Event:
+    event_id: str
+    name: str
+    time: str  # "ЧЧ:ММ" для вывода
+    timestamp: int  # Начало
+    creator_id: str
+    participants: list = field(default_factory=list)
+    active: bool = True
+    created_at: int = None
+    completed_at: int = None
+    track: int = 0  # Дорожка расписания для параллельных ивентов
+
+    @classmethod
+    def from_db(cls, event_id: str, data: dict):
+        return cls(
+            event_id=event_id,
+            name=data.get("name", ""),
+            time=data.get("time", ""),
+            timestamp=parse_timestamp(data.get("timestamp")),
+            creator_id=str(data.get("creator_id", "")),
+            participants=[int(user_id) for user_id in as_dict(data.get("participants")).values()],
+            active=bool(data.get("active", False)),
+            created_at=parse_timestamp(data.get("created_at")),
+            completed_at=parse_timestamp(data.get("completed_at")),
+            track=data.get("track", 0)
+        )
+
+    def to_db(self):
+        return without_none({
+            "name": self.name,
+            "time": self.time,
+            "timestamp": self.timestamp,
+            "creator_id": self.creator_id,
+            "participants": self.participants,
+            "active": self.active,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "track": self.track
+        })
+
+def parse_events(data):
+    return [Event.from_db(key, value) for key, value in as_dict(data).items() if isinstance(value, dict)]
+
+@dataclass(slots=True)
+class StatsEntry:
+    date: int
+    added_minutes: int = 0
+    added_reports: int = 0
+
+    @classmethod
+    def from_db(cls, data: dict):
+        return cls(parse_timestamp(data.get("date")), data.get("added_minutes", 0), data.get("added_reports", 0))
+
+    def to_db(self):
+        return {"date": self.date, "added_minutes": self.added_minutes, "added_reports": self.added_reports}
+
+@dataclass(slots=True)
+class UserStats:
+    static_id: str
+    name: str = ""
+    total_minutes: int = 0
+    total_reports: int = 0
+    last_updated: int = None
+    last_entry: StatsEntry = None
+    discord_id: str = None
+
+    @classmethod
+    def from_db(cls, static_id: str, data: dict):
+        last_entry = data.get("last_entry")
+        return cls(
+            static_id=static_id,
+            name=data.get("name", ""),
+            total_minutes=data.get("total_minutes", 0),
+            total_reports=data.get("total_reports", 0),
+            last_updated=parse_timestamp(data.get("last_updated")),
+            last_entry=StatsEntry.from_db(last_entry) if isinstance(last_entry, dict) else None,
+            discord_id=data.get("discord_id")
+        )
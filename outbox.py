@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections import deque
+
+import aiohttp
+import discord
+
+log = logging.getLogger(__name__)
+
+# Исходящие сообщения в служебные каналы (аудит, выговоры, ивенты, уведомления).
+# Команда только ставит сообщение в очередь канала и сразу отвечает; отправляет
+# фоновая задача канала, по одному запросу за раз — так запросы не толкаются в
+# одном rate-limit бакете канала. Подряд идущие сообщения из одних embed'ов,
+# накопившиеся пока шла предыдущая отправка, уходят одним сообщением (до 10
+# embed'ов и 6000 символов). Сообщения с текстом или кнопками идут отдельно и
+# в том же порядке. Задача канала завершается, когда очередь пуста.
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000  # Лимит Discord на суммарный текст embed'ов одного сообщения
+
+class ChannelOutbox:
+    def __init__(self, retries: int = 3, backoff: float = 1.0):
+        self.retries = retries
+        self.backoff = backoff
+        self._pending = {}  # channel_id -> deque[(content, embed, view)]
+        self._tasks = {}
+        self.messages_sent = 0
+        self.embeds_sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def send(self, channel, content: str = None, embed: discord.Embed = None, view: discord.ui.View = None):
+        self._pending.setdefault(channel.id, deque()).append((content, embed, view))
+        if channel.id not in self._tasks:
+            self._tasks[channel.id] = asyncio.create_task(self._drain(channel))
+
+    async def _drain(self, channel):
+        pending = self._pending[channel.id]
+        try:
+            while pending:
+                content, embeds, view = next_batch(pending)
+                await self._deliver(channel, content, embeds, view)
+        finally:
+            del self._tasks[channel.id]
+
+    async def _deliver(self, channel, content, embeds, view):
+        attempt = 0
+        while True:
+            try:
+                kwargs = {"embeds": embeds} if embeds else {}
+                if view is not None:
+                    kwargs["view"] = view
+                await channel.send(content, **kwargs)
+                self.messages_sent += 1
+                self.embeds_sent += len(embeds)
+                self.coalesced += max(0, len(embeds) - 1)
+                return
+            except (discord.Forbidden, discord.NotFound) as e:
+                log.error("Не удалось отправить сообщение в канал %s: %s", channel.id, e)
+                self.dropped += 1
+                return
+            except discord.RateLimited as e:
+                # discord.py сам ждет бакет; сюда попадают только слишком долгие ожидания
+                delay = e.retry_after
+                error = e
+            except discord.HTTPException as e:
+                if e.status < 500 and e.status != 429:
+                    if len(embeds) > 1:
+                        # Один некорректный embed не должен топить всю пачку
+                        for single in embeds:
+                            await self._deliver(channel, None, [single], None)
+                        return
+                    log.error("Discord отклонил сообщение в канал %s: %s", channel.id, e)
+                    self.dropped += 1
+                    return
+                delay = self.backoff * 2 ** attempt
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = self.backoff * 2 ** attempt
+                error = e
+            if attempt >= self.retries:
+                log.error("Сообщение в канал %s не отправлено после %s попыток: %s", channel.id, attempt + 1, error)
+                self.dropped += 1
+                return
+            attempt += 1
+            self.retried += 1
+            log.warning("Ошибка отправки в канал %s: %s, повтор %s/%s через %.1f с", channel.id, error, attempt, self.retries, delay)
+            await asyncio.sleep(delay)
+
+    async def flush(self):
+        # Дождаться отправки всего, что уже в очередях
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self):
+        return {
+            "queue_depth": sum(len(pending) for pending in self._pending.values()),
+            "messages_sent": self.messages_sent,
+            "embeds_sent": self.embeds_sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
+
+def next_batch(pending: deque):
+    content, embed, view = pending.popleft()
+    embeds = [embed] if embed is not None else []
+    if content is not None or view is not None or embed is None:
+        return content, embeds, view
+    chars = len(embed)
+    while pending and len(embeds) < MAX_EMBEDS:
+        next_content, next_embed, next_view = pending[0]
+        if next_content is not None or next_view is not None or next_embed is None:
+            break
+        if chars + len(next_embed) > MAX_EMBED_CHARS:
+            break
+        pending.popleft()
+        embeds.append(next_embed)
+        chars += len(next_embed)
+    return None, embeds, view
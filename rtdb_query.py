@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+# Семантика запросов RTDB (orderBy + startAt/endAt/equalTo/limitTo*) в памяти:
+# ею отвечают зеркала, фейковая база бенчмарка и сортируется ответ REST,
+# который приходит JSON-объектом без порядка.
+def sort_key(value):
+    # Порядок RTDB: null < false < true < числа < строки < объекты
+    if value is None:
+        return (0, 0)
+    if value is False:
+        return (1, 0)
+    if value is True:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
+
+def child_value(key, value, order_by: str):
+    if order_by == "$key":
+        return key
+    if order_by == "$value":
+        return value
+    for part in order_by.split("/"):
+        if part:
+            value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def filter_children(children, order_by="$key", start_at=None, end_at=None, equal_to=None, limit_to_first=None, limit_to_last=None):
+    if isinstance(children, list):
+        children = {str(i): child for i, child in enumerate(children) if child is not None}
+    if not isinstance(children, dict):
+        return OrderedDict()
+    items = [(sort_key(child_value(key, child, order_by)), key, child) for key, child in children.items()]
+    items.sort(key=lambda item: (item[0], item[1]))
+    if equal_to is not None:
+        items = [item for item in items if item[0] == sort_key(equal_to)]
+    if start_at is not None:
+        items = [item for item in items if item[0] >= sort_key(start_at)]
+    if end_at is not None:
+        items = [item for item in items if item[0] <= sort_key(end_at)]
+    if limit_to_first is not None:
+        items = items[:limit_to_first]
+    if limit_to_last is not None:
+        items = items[-limit_to_last:] if limit_to_last else []
+    return OrderedDict((key, child) for _, key, child in items)
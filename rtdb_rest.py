@@ -0,0 +1,206 @@
+import asyncio
+import copy
+import json
+import logging
+import time
+from urllib.parse import quote
+
+import aiohttp
+
+from rtdb_query import filter_children
+
+log = logging.getLogger(__name__)
+
+# Асинхронный клиент REST API Realtime Database на aiohttp — замена синхронного
+# SDK для get/set/update/delete/query без прыжков в пул потоков. Одна сессия с
+# пулом keep-alive соединений на весь процесс: параллельные запросы идут по уже
+# открытым TLS-соединениям, новые открываются только сверх занятых.
+# base_url может указывать на локальный сервер-заглушку (bench/stub_rtdb.py).
+TOKEN_REFRESH_MARGIN = 300  # Обновляем токен за 5 минут до истечения
+RETRY_STATUSES = (500, 502, 503, 504)
+TRANSACTION_ATTEMPTS = 25  # Как у SDK
+
+class RestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"RTDB REST {status}: {message}")
+        self.status = status
+        self.message = message
+
+class RestBackend:
+    def __init__(self, base_url: str, token_provider=None, pool_size: int = 32, timeout: float = 15, retries: int = 2):
+        self.base_url = base_url.rstrip("/")
+        # token_provider() -> (access_token, expires_at_epoch); None — без авторизации (заглушка)
+        self.token_provider = token_provider
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self._session = None
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = None
+        self.requests = 0
+        self.retried = 0
+        self.errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.token_refreshes = 0
+        self.conflicts = 0
+
+    def _trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params):
+            self.connections_created += 1
+
+        async def on_reuse(session, context, params):
+            self.connections_reused += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def _get_session(self):
+        # Сессия привязана к циклу событий, поэтому создается лениво в рабочем цикле
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    async def _auth_headers(self, force_refresh=False):
+        if self.token_provider is None:
+            return {}
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if force_refresh or self._token is None or time.time() > self._token_expires - TOKEN_REFRESH_MARGIN:
+                # Провайдер ходит в OAuth Google синхронно
+                self._token, self._token_expires = await asyncio.to_thread(self.token_provider)
+                self.token_refreshes += 1
+        return {"Authorization": f"Bearer {self._token}"}
+
+    def url(self, path: str):
+        path = "/".join(part for part in str(path).split("/") if part)
+        return f"{self.base_url}/{quote(path, safe='/')}.json"
+
+    async def _request(self, method: str, path: str, params=None, body=None, retry=True, headers=None, with_etag=False):
+        params = dict(params or {})
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else None
+        if method != "GET":
+            # Сервер не присылает записанные данные обратно
+            params["print"] = "silent"
+        session = self._get_session()
+        attempt = 0
+        refreshed = force_refresh = False
+        while True:
+            request_headers = await self._auth_headers(force_refresh)
+            request_headers.update(headers or {})
+            force_refresh = False
+            if data is not None:
+                request_headers["Content-Type"] = "application/json"
+            self.requests += 1
+            try:
+                async with session.request(method, self.url(path), params=params, data=data, headers=request_headers) as response:
+                    if response.status == 204:
+                        return (None, response.headers.get("ETag")) if with_etag else None
+                    text = await response.text()
+                    if response.status == 401 and self.token_provider is not None and not refreshed:
+                        # Токен отозван раньше срока — берем новый и повторяем один раз
+                        refreshed = force_refresh = True
+                        continue
+                    if response.status >= 400:
+                        try:
+                            message = json.loads(text).get("error", text)
+                        except (ValueError, AttributeError):
+                            message = text
+                        raise RestError(response.status, message)
+                    value = json.loads(text) if text else None
+                    return (value, response.headers.get("ETag")) if with_etag else value
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, RestError) as e:
+                retryable = not isinstance(e, RestError) or e.status in RETRY_STATUSES
+                if not retryable or not retry or attempt >= self.retries:
+                    self.errors += 1
+                    raise
+                attempt += 1
+                self.retried += 1
+                log.warning("RTDB REST %s %s: %s, повтор %s/%s", method, path, e, attempt, self.retries)
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+    async def get(self, path: str, shallow: bool = False):
+        return await self._request("GET", path, {"shallow": "true"} if shallow else None)
+
+    async def set(self, path: str, value):
+        if value is None:
+            await self.delete(path)
+            return
+        await self._request("PUT", path, body=value)
+
+    async def update(self, path: str, value: dict):
+        # PATCH с серверными инкрементами при повторе применился бы дважды
+        await self._request("PATCH", path, body=value, retry=not has_server_values(value))
+
+    async def delete(self, path: str):
+        await self._request("DELETE", path)
+
+    async def transaction(self, path: str, update):
+        # Условная запись по ETag (if-match): при 412 узел изменился — читаем заново и повторяем
+        for _ in range(TRANSACTION_ATTEMPTS):
+            value, etag = await self._request("GET", path, headers={"X-Firebase-ETag": "true"}, with_etag=True)
+            new_value = update(copy.deepcopy(value))
+            if new_value == value:
+                return value
+            try:
+                if new_value is None:
+                    await self._request("DELETE", path, headers={"if-match": etag})
+                else:
+                    await self._request("PUT", path, body=new_value, headers={"if-match": etag})
+                return new_value
+            except RestError as e:
+                if e.status != 412:
+                    raise
+                self.conflicts += 1
+        raise RestError(412, f"транзакция по {path} не прошла за {TRANSACTION_ATTEMPTS} попыток")
+
+    async def query(self, path, order_by, start_at, end_at, equal_to, limit_to_first, limit_to_last):
+        # Параметры фильтрации — JSON-значения, как требует REST API
+        params = {"orderBy": json.dumps(order_by)}
+        if start_at is not None:
+            params["startAt"] = json.dumps(start_at, ensure_ascii=False)
+        if end_at is not None:
+            params["endAt"] = json.dumps(end_at, ensure_ascii=False)
+        if equal_to is not None:
+            params["equalTo"] = json.dumps(equal_to, ensure_ascii=False)
+        if limit_to_first is not None:
+            params["limitToFirst"] = str(limit_to_first)
+        if limit_to_last is not None:
+            params["limitToLast"] = str(limit_to_last)
+        # Ответ — JSON-объект без порядка; восстанавливаем порядок запроса
+        return filter_children(await self._request("GET", path, params) or {}, order_by)
+
+    def stats(self):
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        return {
+            "backend": "rest",
+            "requests": self.requests,
+            "retried": self.retried,
+            "errors": self.errors,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "pool_size": self.pool_size,
+            "pool_in_use": len(getattr(connector, "_acquired", ())) if connector is not None else 0,
+            "token_refreshes": self.token_refreshes,
+            "transaction_conflicts": self.conflicts
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+def has_server_values(value):
+    if isinstance(value, dict):
+        return ".sv" in value or any(has_server_values(child) for child in value.values())
+    return False
@@ -0,0 +1,92 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# Планировщик дедлайнов на куче: одна фоновая задача спит ровно до ближайшего
+# срока и вызывает callback(key). Отмена ленивая — запись в куче просто
+# перестает совпадать со словарем актуальных сроков. Ключ остается в
+# расписании, пока callback не отработает без ошибки: при ошибке — повтор с
+# растущей паузой.
+class DeadlineScheduler:
+    MAX_SLEEP = 3600  # Перепроверка раз в час на случай сдвига системных часов
+    RETRY_DELAY = 15  # Секунд до первого повтора после ошибки callback
+    MAX_RETRY_DELAY = 900
+
+    def __init__(self, callback, name: str):
+        self.callback = callback
+        self.name = name
+        self._heap = []
+        self._deadlines = {}  # key -> (срок, номер записи)
+        self._sequence = itertools.count()
+        self._failures = {}  # key -> число ошибок подряд
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def schedule(self, key, deadline):
+        if isinstance(deadline, datetime):
+            deadline = deadline.timestamp()
+        # Номер записи отличает перепланирование на тот же срок от старой записи
+        entry = (deadline, next(self._sequence))
+        self._deadlines[key] = entry
+        heapq.heappush(self._heap, (*entry, key))
+        if self._heap[0][:2] == entry:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        self._failures.pop(key, None)
+        return self._deadlines.pop(key, None) is not None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _next_due(self):
+        # Выбрасываем из вершины кучи отмененные и перепланированные записи
+        while self._heap:
+            deadline, sequence, key = self._heap[0]
+            if self._deadlines.get(key) == (deadline, sequence):
+                return deadline, key
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._next_due()
+            delay = self.MAX_SLEEP if due is None else min(due[0] - time.time(), self.MAX_SLEEP)
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            deadline, sequence, key = heapq.heappop(self._heap)
+            entry = (deadline, sequence)
+            # Пока идет callback, ключ остается в _deadlines: callback может сам
+            # перепланировать или отменить его, тогда запись в словаре уже другая
+            try:
+                await self.callback(key)
+            except Exception as e:
+                if self._deadlines.get(key) != entry:
+                    log.error("Ошибка в планировщике %s для %s: %s", self.name, key, e)
+                    continue
+                failures = self._failures.get(key, 0) + 1
+                self._failures[key] = failures
+                retry_delay = min(self.RETRY_DELAY * 2 ** (failures - 1), self.MAX_RETRY_DELAY)
+                log.error("Ошибка в планировщике %s для %s: %s, повтор через %s с", self.name, key, e, retry_delay)
+                self.schedule(key, time.time() + retry_delay)
+                continue
+            self._failures.pop(key, None)
+            if self._deadlines.get(key) == entry:
+                del self._deadlines[key]
@@ -0,0 +1,77 @@
+import csv
+import re
+
+# Разбор строк импорта статистики. Текст команды и файлы TXT — по STAT_LINE_RE,
+# непонятное время или репорты считаются нулем. Файлы CSV — через csv.reader с
+# разделителем по первой строке, непонятное поле делает строку некорректной.
+TIME_RE = re.compile(r'(\d+)\sч\.\s(\d+)\sм\.')
+# Строка статистики "Name | #static_id | 5 ч. 30 м. | 12" за один проход, по прежним
+# правилам: ровно четыре поля через "|" (текст команды и файлы TXT)
+STAT_LINE_RE = re.compile(
+    r'\s*(?P<name>[^|]*?)\s*\|'
+    r'[^|]*?#(?P<static_id>\d+)[^|]*\|'
+    r'\s*(?:(?P<hours>\d+)\sч\.\s(?P<minutes>\d+)\sм\.)?[^|]*\|'
+    r'\s*(?P<reports>[^|]*?)\s*'
+)
+STATS_SPLIT_RE = re.compile(r'(?=\b[A-Za-z]+\s*\|)')
+# Поля строки CSV после csv.reader: static_id с "#", время пустое или "5 ч. 30 м.", репорты пустые или число
+CSV_STATIC_ID_RE = re.compile(r'[^#]*#(\d+)\D*')
+CSV_DELIMITERS = ",;\t|"
+
+def parse_time_to_minutes(time_str):
+    match = TIME_RE.match(time_str)
+    if match:
+        hours, minutes = map(int, match.groups())
+        return hours * 60 + minutes
+    return 0
+
+def format_minutes_to_hours(minutes):
+    hours = minutes // 60
+    mins = minutes % 60
+    return f"{hours} ч. {mins} м."
+
+def parse_stat_line(line):
+    match = STAT_LINE_RE.fullmatch(line)
+    if not match:
+        return None
+    hours, minutes, reports = match.group("hours", "minutes", "reports")
+    return {
+        "name": match.group("name"),
+        "static_id": match.group("static_id"),
+        "minutes": int(hours) * 60 + int(minutes) if hours else 0,
+        "reports": int(reports) if reports.isdigit() else 0
+    }
+
+def parse_stat_fields(fields: list):
+    # В отличие от parse_stat_line, непонятное поле — ошибка строки, а не ноль
+    if len(fields) != 4:
+        return None
+    name, static_field, time_field, reports = (field.strip() for field in fields)
+    static_match = CSV_STATIC_ID_RE.fullmatch(static_field)
+    time_match = TIME_RE.fullmatch(time_field)
+    if not static_match or (time_field and not time_match) or (reports and not reports.isdigit()):
+        return None
+    return {
+        "name": name,
+        "static_id": static_match.group(1),
+        "minutes": parse_time_to_minutes(time_field) if time_field else 0,
+        "reports": int(reports) if reports else 0
+    }
+
+def csv_stat_parser():
+    # Разделитель определяется по первой строке файла; кавычки снимает csv.reader
+    dialect = None
+
+    def parse(line):
+        nonlocal dialect
+        if dialect is None:
+            try:
+                dialect = csv.Sniffer().sniff(line, delimiters=CSV_DELIMITERS)
+            except csv.Error:
+                dialect = csv.excel
+        try:
+            fields = next(csv.reader([line], dialect, strict=True))
+        except (csv.Error, StopIteration):
+            return None
+        return parse_stat_fields(fields)
+    return parse
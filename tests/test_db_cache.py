@@ -0,0 +1,161 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from db_cache import DBCache, increment
+from mirror import RealtimeMirror
+
+class FakeBackend:
+    # Бэкенд в памяти: считает чтения, чтение можно задержать до gate.set()
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.reads = 0
+        self.writes = []
+        self.gate = None
+        self.fail_writes = False
+
+    async def get(self, path, shallow=False):
+        # Значение берется в начале чтения, ответ приходит после gate.set()
+        self.reads += 1
+        value = self.data.get(path)
+        if self.gate is not None:
+            await self.gate.wait()
+        return value
+
+    async def set(self, path, value):
+        self.writes.append(("set", path, value))
+        if self.fail_writes:
+            raise RuntimeError("write failed")
+        self.data[path] = value
+
+    async def update(self, path, value):
+        self.writes.append(("update", path, value))
+        if self.fail_writes:
+            raise RuntimeError("write failed")
+
+    def stats(self):
+        return {"backend": "fake"}
+
+def test_concurrent_misses_share_one_read():
+    async def run():
+        backend = FakeBackend({"user_stats/1": {"total_minutes": 5}})
+        backend.gate = asyncio.Event()
+        cache = DBCache(backend)
+        readers = [asyncio.ensure_future(cache.get("user_stats/1")) for _ in range(5)]
+        await asyncio.sleep(0)
+        backend.gate.set()
+        values = await asyncio.gather(*readers)
+        values[0]["total_minutes"] = 99
+        return backend.reads, cache.coalesced, values, cache.stats()["inflight"]
+    reads, coalesced, values, inflight = asyncio.run(run())
+    assert (reads, coalesced, inflight) == (1, 4, 0)
+    # Результат у каждого свой: правка одной копии не видна остальным
+    assert [value["total_minutes"] for value in values[1:]] == [5] * 4
+
+def test_cancelled_waiter_does_not_cancel_shared_read():
+    async def run():
+        backend = FakeBackend({"a": 1})
+        backend.gate = asyncio.Event()
+        cache = DBCache(backend)
+        first = asyncio.ensure_future(cache.get("a"))
+        second = asyncio.ensure_future(cache.get("a"))
+        await asyncio.sleep(0)
+        first.cancel()
+        backend.gate.set()
+        return await second, backend.reads
+    assert asyncio.run(run()) == (1, 1)
+
+def test_failed_read_reaches_every_waiter_and_is_not_cached():
+    class FailingBackend(FakeBackend):
+        async def get(self, path, shallow=False):
+            self.reads += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("read failed")
+
+    async def run():
+        backend = FailingBackend()
+        cache = DBCache(backend)
+        results = await asyncio.gather(cache.get("a"), cache.get("a"), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await cache.get("a")
+        return results, backend.reads
+    results, reads = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert reads == 2
+
+def test_hit_after_miss_and_invalidation_of_ancestors_and_queries():
+    async def run():
+        backend = FakeBackend({"events": {"e1": {"active": True}}, "events/e1": {"active": True}})
+        cache = DBCache(backend)
+        await cache.get("events")
+        await cache.get("events/e1")
+        await cache.get("events")
+        hits = cache.hits
+        cache._store('events?["active"]', {"e1": {"active": True}})
+        await cache.update("", {"events/e1/active": False})
+        return hits, dict(cache._entries)
+    hits, entries = asyncio.run(run())
+    assert hits == 1
+    assert entries == {}
+
+def test_write_during_read_is_not_overwritten_by_stale_result():
+    async def run():
+        backend = FakeBackend({"a": "old"})
+        backend.gate = asyncio.Event()
+        cache = DBCache(backend)
+        reader = asyncio.ensure_future(cache.get("a"))
+        while backend.reads < 1:
+            await asyncio.sleep(0)
+        await cache.set("a", "new")
+        # Новое чтение не присоединяется к начатому до записи
+        fresh = asyncio.ensure_future(cache.get("a"))
+        while backend.reads < 2:
+            await asyncio.sleep(0)
+        backend.gate.set()
+        stale = await reader
+        return stale, await fresh, await cache.get("a"), backend.reads
+    stale, fresh, cached, reads = asyncio.run(run())
+    assert (stale, fresh, cached) == ("old", "new", "new")
+    assert reads == 2
+
+def make_mirror(data):
+    mirror = RealtimeMirror(None, "reprimands")
+    mirror._on_event(SimpleNamespace(event_type="put", path="/", data=data))
+    return mirror
+
+def test_reads_come_from_synced_mirror():
+    async def run():
+        backend = FakeBackend()
+        cache = DBCache(backend)
+        cache.attach_mirror(make_mirror({"1": {"active_oral": 2}}))
+        return await cache.get("reprimands/1/active_oral"), await cache.get("reprimands/2"), backend.reads, cache.mirror_reads
+    assert asyncio.run(run()) == (2, None, 0, 2)
+
+def test_server_increment_is_applied_to_mirror():
+    async def run():
+        cache = DBCache(FakeBackend())
+        mirror = make_mirror({"1": {"active_oral": 2}})
+        cache.attach_mirror(mirror)
+        await cache.update("reprimands/1", {"active_oral": increment(1), "active_strict": increment(1)})
+        await cache.update("", {"reprimands/1/active_oral": increment(-3)})
+        return mirror.read("reprimands/1")
+    assert asyncio.run(run()) == {"active_oral": 0, "active_strict": 1}
+
+def test_failed_write_resyncs_mirror():
+    async def run():
+        backend = FakeBackend()
+        backend.fail_writes = True
+        cache = DBCache(backend)
+        mirror = make_mirror({"1": {"active_oral": 2}})
+        resyncs = []
+
+        async def resync(reason):
+            resyncs.append(reason)
+        mirror.resync = resync
+        cache.attach_mirror(mirror)
+        with pytest.raises(RuntimeError):
+            await cache.set("reprimands/1/active_oral", 5)
+        await asyncio.sleep(0)
+        return resyncs, backend.reads
+    assert asyncio.run(run()) == (["ошибка записи"], 0)
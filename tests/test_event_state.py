@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from event_state import EventState
+from models import Event
+
+BASE = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+COOLDOWN = timedelta(minutes=50)
+
+def at(minutes):
+    return BASE + timedelta(minutes=minutes)
+
+def event(event_id, start, active=True, completed_at=None, track=0):
+    return Event(event_id=event_id, name=event_id, time="", timestamp=int(start.timestamp()), creator_id="1",
+                 active=active, completed_at=int(completed_at.timestamp()) if completed_at else None, track=track)
+
+def test_conflict_inside_cooldown_window():
+    state = EventState(COOLDOWN)
+    state.add("a", at(60))
+    assert state.conflict(at(60 - 49)) == (at(60), "a")
+    assert state.conflict(at(60 + 49)) == (at(60), "a")
+    assert state.conflict(at(60 - 50)) is None
+    assert state.conflict(at(60 + 50)) is None
+
+def test_remove_frees_the_slot():
+    state = EventState(COOLDOWN)
+    state.add("a", at(60))
+    state.remove("a")
+    assert state.conflict(at(60)) is None
+
+def test_conflict_only_when_every_track_is_busy():
+    state = EventState(COOLDOWN, tracks=2)
+    state.add("a", at(60), track=0)
+    assert state.conflict(at(60)) is None
+    assert state.free_track(at(60), BASE) == 1
+    state.add("b", at(70), track=1)
+    assert state.conflict(at(60)) == (at(60), "a")
+    assert state.free_track(at(60), BASE) is None
+
+def test_next_free_slot_skips_chain_of_bookings():
+    state = EventState(COOLDOWN)
+    state.add("a", at(0))
+    state.add("b", at(50))
+    assert state.next_free_slot(at(10), BASE) == (at(100), 0)
+
+def test_next_free_slot_rounds_up_to_step():
+    state = EventState(COOLDOWN)
+    assert state.next_free_slot(at(1), BASE) == (at(5), 0)
+    assert state.next_free_slot(at(5), BASE) == (at(5), 0)
+
+def test_next_free_slot_respects_completion_cooldown_and_limit():
+    state = EventState(COOLDOWN)
+    state.mark_completed(None, at(0))
+    assert state.next_free_slot(at(0), at(0)) == (at(50), 0)
+    assert state.next_free_slot(at(0), at(0), until=at(45)) is None
+
+def test_load_books_active_and_remembers_last_completion():
+    state = EventState(COOLDOWN)
+    state.load([
+        event("old", at(-200), active=False, completed_at=at(-100)),
+        event("done", at(-120), active=False, completed_at=at(-20)),
+        event("next", at(60))
+    ], timezone.utc)
+    assert state.loaded
+    assert state.last_completion_time == at(-20)
+    assert state.conflict(at(60)) == (at(60), "next")
+    assert state.earliest_start(0, BASE) == at(30)
+
+def test_mark_completed_releases_booking():
+    state = EventState(COOLDOWN)
+    state.add("a", at(60))
+    state.mark_completed("a", at(90))
+    assert state.conflict(at(60)) is None
+    assert state.last_completion_time == at(90)
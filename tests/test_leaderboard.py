@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from leaderboard import Leaderboard, RankedBoard
+
+TODAY = date(2026, 3, 1)
+
+def days_ago(days):
+    return TODAY - timedelta(days=days)
+
+def test_ranked_board_orders_and_updates():
+    board = RankedBoard()
+    board.set("a", 10)
+    board.set("b", 30)
+    board.add("a", 25)
+    assert board.page(0, 10) == [(1, "a", 35), (2, "b", 30)]
+    assert board.rank("b") == 2
+    board.set("a", 0)
+    assert len(board) == 1 and board.rank("a") is None
+
+def test_daily_buckets_fill_windows():
+    leaderboard = Leaderboard()
+    leaderboard.add_daily("a", {days_ago(0): (60, 1), days_ago(6): (30, 2), days_ago(20): (10, 4), days_ago(40): (5, 8)}, TODAY)
+    assert leaderboard.board("minutes", "7d", TODAY).score("a") == 90
+    assert leaderboard.board("minutes", "30d", TODAY).score("a") == 100
+    assert leaderboard.board("reports", "30d", TODAY).score("a") == 7
+
+def test_roll_drops_days_leaving_the_window():
+    leaderboard = Leaderboard()
+    leaderboard.add_daily("a", {days_ago(6): (30, 1), days_ago(0): (60, 1)}, TODAY)
+    leaderboard.add_daily("b", {days_ago(29): (45, 1)}, TODAY)
+    tomorrow = TODAY + timedelta(days=1)
+    assert leaderboard.board("minutes", "7d", tomorrow).score("a") == 60
+    assert leaderboard.board("minutes", "30d", tomorrow).score("a") == 90
+    assert leaderboard.board("minutes", "30d", tomorrow).rank("b") is None
+
+def test_roll_over_several_days_at_once():
+    leaderboard = Leaderboard()
+    leaderboard.add_daily("a", {days_ago(day): (10, 1) for day in range(30)}, TODAY)
+    later = TODAY + timedelta(days=10)
+    assert leaderboard.board("minutes", "7d", later).score("a") == 0
+    assert leaderboard.board("minutes", "30d", later).score("a") == 200
+    assert min(leaderboard._days) == days_ago(19)
+
+def test_totals_are_not_windowed():
+    leaderboard = Leaderboard()
+    leaderboard.set_totals("a", "Ivan", 600, 40)
+    leaderboard.add_daily("a", {days_ago(0): (60, 1)}, TODAY)
+    later = TODAY + timedelta(days=60)
+    assert leaderboard.board("minutes", "all", later).score("a") == 600
+    assert leaderboard.board("minutes", "30d", later).score("a") == 0
+    assert leaderboard.names["a"] == "Ivan"
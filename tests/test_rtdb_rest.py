@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from bench import stub_rtdb
+from bench.fake_firebase import FakeDatabase
+from rtdb_rest import TRANSACTION_ATTEMPTS, RestBackend, RestError
+
+def run_with_stub(data, scenario):
+    # scenario(backend, database) на RestBackend, подключенном к заглушке REST API
+    async def run():
+        database = FakeDatabase()
+        database.load(data)
+        runner, url = await stub_rtdb.start(database)
+        backend = RestBackend(url)
+        try:
+            return await scenario(backend, database)
+        finally:
+            await backend.close()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+def test_transaction_writes_new_value():
+    async def scenario(backend, database):
+        value = await backend.transaction("counters/a", lambda current: (current or 0) + 1)
+        return value, database.read(["counters", "a"]), backend.conflicts
+    assert run_with_stub({"counters": {"a": 4}}, scenario) == (5, 5, 0)
+
+def test_unchanged_value_is_not_written():
+    async def scenario(backend, database):
+        requests = database.round_trips
+        value = await backend.transaction("counters/a", lambda current: current)
+        return value, database.round_trips - requests
+    assert run_with_stub({"counters": {"a": 4}}, scenario) == (4, 1)
+
+def test_conflicting_write_retries_with_fresh_value():
+    async def scenario(backend, database):
+        seen = []
+
+        def update(current):
+            seen.append(current)
+            if len(seen) == 1:
+                # Конкурентная запись между чтением и условной записью
+                database.reference("counters/a").set(10)
+            return current + 1
+        value = await backend.transaction("counters/a", update)
+        return value, seen, database.read(["counters", "a"]), backend.conflicts
+    assert run_with_stub({"counters": {"a": 4}}, scenario) == (11, [4, 10], 11, 1)
+
+def test_none_deletes_the_node():
+    async def scenario(backend, database):
+        value = await backend.transaction("reprimands/1", lambda current: None)
+        return value, database.read(["reprimands"])
+    assert run_with_stub({"reprimands": {"1": {"active_oral": 1}}}, scenario) == (None, None)
+
+def test_concurrent_transactions_do_not_lose_updates():
+    async def scenario(backend, database):
+        await asyncio.gather(*(backend.transaction("counters/a", lambda current: (current or 0) + 1) for _ in range(10)))
+        return database.read(["counters", "a"])
+    assert run_with_stub({}, scenario) == 10
+
+def test_gives_up_after_attempts_with_412():
+    async def scenario(backend, database):
+        calls = 0
+
+        def update(current):
+            nonlocal calls
+            calls += 1
+            database.reference("counters/a").set(calls * 100)
+            return -1
+        with pytest.raises(RestError) as error:
+            await backend.transaction("counters/a", update)
+        return error.value.status, calls, backend.conflicts
+    assert run_with_stub({"counters": {"a": 0}}, scenario) == (412, TRANSACTION_ATTEMPTS, TRANSACTION_ATTEMPTS)
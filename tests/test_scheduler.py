@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from scheduler import DeadlineScheduler
+
+class Recorder:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+
+    async def __call__(self, key):
+        self.calls.append(key)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("write failed")
+
+def make_scheduler(callback):
+    scheduler = DeadlineScheduler(callback, "test")
+    scheduler.RETRY_DELAY = 0.02
+    scheduler.MAX_RETRY_DELAY = 0.05
+    return scheduler
+
+def test_fires_in_deadline_order():
+    async def run():
+        recorder = Recorder()
+        scheduler = make_scheduler(recorder)
+        now = time.time()
+        scheduler.schedule("late", now + 0.06)
+        scheduler.schedule("early", now + 0.02)
+        scheduler.start()
+        await asyncio.sleep(0.15)
+        return recorder.calls, len(scheduler)
+    assert asyncio.run(run()) == (["early", "late"], 0)
+
+def test_cancel_is_lazy_and_final():
+    async def run():
+        recorder = Recorder()
+        scheduler = make_scheduler(recorder)
+        scheduler.schedule("a", time.time() + 0.03)
+        scheduler.start()
+        assert scheduler.cancel("a")
+        assert not scheduler.cancel("a")
+        await asyncio.sleep(0.08)
+        return recorder.calls, len(scheduler._heap)
+    assert asyncio.run(run()) == ([], 0)
+
+def test_reschedule_replaces_old_deadline():
+    async def run():
+        recorder = Recorder()
+        scheduler = make_scheduler(recorder)
+        now = time.time()
+        scheduler.schedule("a", now + 0.02)
+        scheduler.schedule("a", now + 0.08)
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        early = list(recorder.calls)
+        await asyncio.sleep(0.08)
+        return early, recorder.calls
+    assert asyncio.run(run()) == ([], ["a"])
+
+def test_failed_callback_is_retried_until_success():
+    async def run():
+        recorder = Recorder(failures=2)
+        scheduler = make_scheduler(recorder)
+        scheduler.schedule("a", time.time())
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        return recorder.calls, "a" in scheduler, scheduler._failures
+    assert asyncio.run(run()) == (["a", "a", "a"], False, {})
+
+def test_cancel_stops_retries():
+    async def run():
+        recorder = Recorder(failures=10)
+        scheduler = make_scheduler(recorder)
+        scheduler.schedule("a", time.time())
+        scheduler.start()
+        await asyncio.sleep(0.01)
+        assert "a" in scheduler
+        scheduler.cancel("a")
+        await asyncio.sleep(0.1)
+        return recorder.calls, scheduler._failures
+    assert asyncio.run(run()) == (["a"], {})
+
+def test_callback_may_reschedule_its_own_key():
+    async def run():
+        calls = []
+        scheduler = None
+
+        async def callback(key):
+            calls.append(key)
+            if len(calls) == 1:
+                scheduler.schedule(key, time.time() + 0.02)
+        scheduler = make_scheduler(callback)
+        scheduler.schedule("a", time.time())
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        return calls, "a" in scheduler
+    assert asyncio.run(run()) == (["a", "a"], False)
@@ -0,0 +1,41 @@
+from stats_parser import STATS_SPLIT_RE, csv_stat_parser, parse_stat_line
+
+def test_text_line():
+    assert parse_stat_line("Ivan | #12 | 5 ч. 30 м. | 7") == {"name": "Ivan", "static_id": "12", "minutes": 330, "reports": 7}
+
+def test_text_line_keeps_commas_in_name():
+    assert parse_stat_line("Smith, John | #12 | 1 ч. 0 м. | 2")["name"] == "Smith, John"
+
+def test_text_line_unreadable_time_and_reports_are_zero():
+    stat = parse_stat_line("Ivan | #12 | - | нет")
+    assert (stat["minutes"], stat["reports"]) == (0, 0)
+
+def test_text_line_needs_pipes():
+    assert parse_stat_line("Ivan; #12; 5 ч. 30 м.; 7") is None
+    assert parse_stat_line("Ivan | 12 | 5 ч. 30 м. | 7") is None
+
+def test_split_command_text():
+    parts = [part.strip() for part in STATS_SPLIT_RE.split("Ivan | #1 | 1 ч. 0 м. | 1 Petr | #2 | 2 ч. 0 м. | 2") if part.strip()]
+    assert [parse_stat_line(part)["static_id"] for part in parts] == ["1", "2"]
+
+def test_csv_semicolon():
+    parse = csv_stat_parser()
+    assert parse("Ivan;#12;5 ч. 30 м.;7") == {"name": "Ivan", "static_id": "12", "minutes": 330, "reports": 7}
+    assert parse("Petr;#13;;")["minutes"] == 0
+
+def test_csv_quoted_field_with_delimiter():
+    parse = csv_stat_parser()
+    assert parse('"Smith, John",#12,1 ч. 0 м.,2')["name"] == "Smith, John"
+
+def test_csv_dialect_comes_from_first_line():
+    parse = csv_stat_parser()
+    assert parse("Ivan\t#12\t1 ч. 0 м.\t2") is not None
+    assert parse("Petr;#13;1 ч. 0 м.;2") is None
+
+def test_csv_rejects_malformed_fields():
+    parse = csv_stat_parser()
+    assert parse("Ivan,#12,1 ч. 0 м.,2") is not None
+    assert parse("Ivan,12,1 ч. 0 м.,2") is None
+    assert parse("Ivan,#12,полчаса,2") is None
+    assert parse("Ivan,#12,1 ч. 0 м.,два") is None
+    assert parse("Ivan,#12,1 ч. 0 м.") is None